@@ -1,69 +1,74 @@
 import streamlit as st
 import json
-import pandas as pd
 from pathlib import Path
 import os
-import numpy as np
 from dotenv import load_dotenv
-import time
-import io
-
-# Load environment variables (for local development)
-load_dotenv()
-
-# Try alternative import approach with better secrets handling
-try:
-    from openai import OpenAI
-    
-    # Handle secrets more gracefully
-    api_key = None
+from openai import OpenAI
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import tiktoken
+
+# Load environment variables (for local development); skip the .env lookup when already set
+if not os.getenv("OPENAI_API_KEY"):
+    load_dotenv()
+
+def resolve_api_key():
+    """Read the OpenAI API key from Streamlit secrets (cloud) or the environment (local development)"""
     try:
-        # Try to get from Streamlit secrets first (for cloud deployment)
-        api_key = st.secrets["openai"]["OPENAI_API_KEY"]
+        return st.secrets["openai"]["OPENAI_API_KEY"]
     except (FileNotFoundError, KeyError):
-        # Fall back to environment variable (for local development)
-        api_key = os.getenv("OPENAI_API_KEY")
-    
+        return os.getenv("OPENAI_API_KEY")
+
+def prewarm_openai_connection(client):
+    """Open a pooled connection to the API with a lightweight request; failures only cost the warm-up"""
+    try:
+        client.models.list()
+    except Exception as e:
+        print(f"OpenAI connection warm-up failed: {e}")
+
+@st.cache_resource
+def get_openai_client():
+    """Resolve the API key and create the OpenAI client once, so reruns reuse its connection pool"""
+    api_key = resolve_api_key()
     if not api_key:
-        st.error("OpenAI API key not found. Please set OPENAI_API_KEY in your .env file or Streamlit secrets.")
-        st.stop()
+        # Raise instead of returning so a missing key is not cached for the process lifetime
+        raise KeyError("OPENAI_API_KEY")
     
     client = OpenAI(api_key=api_key)
+    # Warm up DNS/TLS in the background so the first analysis reuses an open connection
+    threading.Thread(target=prewarm_openai_connection, args=(client,), daemon=True).start()
     
-except ImportError:
-    # Fallback to older API
-    import openai
-    
-    # Handle secrets more gracefully for older API
-    api_key = None
-    try:
-        api_key = st.secrets["openai"]["OPENAI_API_KEY"]
-    except (FileNotFoundError, KeyError):
-        api_key = os.getenv("OPENAI_API_KEY")
-    
-    if not api_key:
-        st.error("OpenAI API key not found. Please set OPENAI_API_KEY in your .env file or Streamlit secrets.")
-        st.stop()
-    
-    openai.api_key = api_key
-    client = openai
+    return client
 
-# Initialize session state for tracking UI flow
-if 'page' not in st.session_state:
-    st.session_state.page = 'home'  # 'home', 'sig_meeting', 'peer_meeting'
+try:
+    client = get_openai_client()
+except KeyError:
+    st.error("OpenAI API key not found. Please set OPENAI_API_KEY in your .env file or Streamlit secrets.")
+    st.stop()
+
+# The current page lives in the URL (?page=...) so it survives reloads and can be shared
+PAGES = ('home', 'sig_meeting', 'peer_meeting')
 
+def current_page():
+    """Page named by the query string, falling back to home for missing or unknown values"""
+    page = st.query_params.get("page", "home")
+    return page if page in PAGES else "home"
+
+# Initialize session state for tracking UI flow
 if 'matched_peer' not in st.session_state:
     st.session_state.matched_peer = None
 
-# Navigation functions
+# Navigation functions, used as on_click callbacks so the click's own rerun renders the new page
 def go_to_home():
-    st.session_state.page = 'home'
+    st.query_params["page"] = 'home'
 
 def go_to_sig_meeting():
-    st.session_state.page = 'sig_meeting'
+    st.query_params["page"] = 'sig_meeting'
 
 def go_to_peer_meeting():
-    st.session_state.page = 'peer_meeting'
+    st.query_params["page"] = 'peer_meeting'
     # Initialize matched peer (hardcoded for now)
     st.session_state.matched_peer = {
         'name': 'Alex Chen',
@@ -72,122 +77,259 @@ def go_to_peer_meeting():
         'shared_challenges': ['Understanding why design arguments fail', 'Articulating testing insights']
     }
 
-# Transcription summarization function for SIG meetings
-def summarize_transcription(transcription, meeting_type="SIG Meeting"):
-    """Summarize the transcription using GPT-4 to extract key coaching points based on meeting type"""
-    
-    if meeting_type == "SIG Meeting":
-        prompt = f"""You are helping a coach organize their verbal assessment notes from a SIG (Student-Instructor/Coach) meeting.
-        
-        Please analyze this transcription of a coaching session between a coach and student and organize it into the following structure:
-        
-        **Assessment Title:** [Brief title summarizing the main issue discussed]
-        **Gap (What needs improvement):** [The main regulation gap or challenge the coach identified in the student]
-        **Context:** [The situation or background where this gap was observed by the coach]
-        **Plan & Reflect:** [Any plans mentioned or reflection questions the coach suggested]
-        **Coach Practice Suggestion:** [Specific practice exercises or activities the coach recommended]
-        
-        Focus on the coach's perspective and assessment of the student's learning gaps.
-        
-        Here's the transcription:
-        {transcription}
-        
-        Please extract and organize the key information into the five categories above. If any category isn't clearly mentioned in the transcription, indicate it as "Not specified" or suggest what might be relevant based on context.
-        """
-    else:  # Peer Conversation
-        prompt = f"""You are helping organize notes from a peer-to-peer discussion between students.
-        
-        Please analyze this transcription of a peer conversation and organize it into the following structure:
-        
-        **Assessment Title:** [Brief title summarizing the main topic or challenge discussed]
-        **Gap (What needs improvement):** [Learning challenges or knowledge gaps identified during the discussion]
-        **Context:** [The situation or background being discussed between peers]
-        **Plan & Reflect:** [Any plans, solutions, or reflection points that emerged from the discussion]
-        **Coach Practice Suggestion:** [Peer recommendations or study strategies suggested]
-        
-        Focus on collaborative learning insights and peer-identified improvement areas.
-        
-        Here's the transcription:
-        {transcription}
-        
-        Please extract and organize the key information into the five categories above. If any category isn't clearly mentioned in the transcription, indicate it as "Not specified" or suggest what might be relevant based on context.
-        """
-    
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",  # Much cheaper than gpt-4
-        messages=[{"role": "system", "content": prompt}],
-        temperature=0.3
-    )
-    
-    return response.choices[0].message.content
+# Chat models: extraction of structured fields runs on the smallest tier,
+# while the narrative meeting summary stays on gpt-4o-mini; either can be overridden per deployment
+MODEL_EXTRACT = os.getenv("OPENAI_MODEL_EXTRACT", "gpt-4.1-nano")
+MODEL_NARRATIVE = os.getenv("OPENAI_MODEL_NARRATIVE", "gpt-4o-mini")
 
-# Meeting summary function for detailed analysis
-def generate_meeting_summary(transcription_text):
-    """Generate a comprehensive meeting summary for the expandable analysis section"""
-    prompt = f"""You are analyzing a peer-to-peer conversation between students discussing their regulation practices and weekly progress.
+# Output cap for the structured extraction calls, so a runaway response can't stall the page;
+# sized so five verbose fields still fit, since a response cut off at the cap is not valid JSON
+EXTRACTION_MAX_TOKENS = 1000
 
-Please provide a comprehensive summary of this peer meeting conversation. Focus on:
+# System prompts are module constants so the invariant prefix is identical on every call
+# (eligible for provider-side prompt caching); the transcript is sent as the user message
+SIG_SYSTEM_PROMPT = """Organize a coach's verbal assessment from a SIG (Student-Instructor/Coach) meeting transcript, from the coach's perspective on the student's learning gaps. Reply with a JSON object with these string keys:
 
-1. The main topics and themes discussed
-2. Each student's challenges and progress with regulation practices
-3. Specific strategies and techniques mentioned
-4. Coach feedback that was shared and discussed
-5. Key insights or breakthroughs mentioned
-6. Plans and commitments made for future improvement
+"title": brief title of the main issue
+"gap": main regulation gap the coach identified
+"context": situation where the coach observed the gap
+"plan": plans or reflection questions the coach suggested
+"coach_suggestion": practice exercises or activities the coach recommended
 
-Write this as a flowing narrative summary that captures the essence of the conversation and the collaborative learning that took place.
+If a field isn't mentioned, write "Not specified" or a brief context-based suggestion."""
 
-Here's the conversation:
-{transcription_text}
+PEER_CONVERSATION_SYSTEM_PROMPT = """Organize notes from a peer-to-peer student discussion transcript, focusing on collaborative learning insights and peer-identified improvement areas. Reply with a JSON object with these string keys:
 
-Provide a detailed but concise summary that would help someone understand what was accomplished in this peer meeting."""
-    
+"title": brief title of the main topic or challenge
+"gap": learning challenges or knowledge gaps identified
+"context": situation being discussed
+"plan": plans, solutions, or reflection points that emerged
+"coach_suggestion": peer recommendations or study strategies suggested
+
+If a field isn't mentioned, write "Not specified" or a brief context-based suggestion."""
+
+# summarize_transcription prompt per meeting type; anything other than a SIG meeting is a peer conversation
+SUMMARY_SYSTEM_PROMPTS = {
+    "SIG Meeting": SIG_SYSTEM_PROMPT,
+    "Peer Conversation": PEER_CONVERSATION_SYSTEM_PROMPT,
+}
+
+MEETING_SUMMARY_SYSTEM_PROMPT = """Summarize a peer conversation between students about their regulation practices and weekly progress as a flowing, detailed but concise narrative covering:
+1. Main topics and themes
+2. Each student's challenges and progress with regulation practices
+3. Strategies and techniques mentioned
+4. Coach feedback shared and discussed
+5. Key insights or breakthroughs
+6. Plans and commitments for future improvement"""
+
+SUMMARY_ACTION_SYSTEM_PROMPT = """Analyze a peer conversation between students about their regulation practices and SIG meeting feedback. Regulation skills are the ability to manage beliefs, emotions, and thoughts effectively across situations to achieve long-term goals.
+
+Reply with a JSON object with these keys:
+
+"summary": 2 sentences on what was discussed, to help the student see their progress and practices for the week
+"action_plan": list of action items for next week, without bullet characters, covering:
+- What they did well in regulation practices to build on
+- How to incorporate coach feedback
+- How to build on this week's progress
+- Additional specific regulation practice steps"""
+
+def build_messages(system_prompt, transcription):
+    """Pair a constant system prompt with the transcript as the user message"""
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": transcription}
+    ]
+
+# Transcripts longer than this are condensed in windows before analysis to bound prompt size
+MAX_TRANSCRIPT_TOKENS = 8000
+TRANSCRIPT_WINDOW_TOKENS = 4000
+
+# Maximum number of OpenAI requests in flight at once when condensing windows
+MAX_CONCURRENT_REQUESTS = 10
+
+CONDENSE_SYSTEM_PROMPT = """Condense this excerpt of a meeting transcript into dense notes. Keep who said what, regulation challenges, strategies, coach feedback, and plans; drop filler."""
+
+@st.cache_resource
+def get_token_encoding():
+    """Tokenizer of the gpt-4o / gpt-4.1 model families"""
+    return tiktoken.get_encoding("o200k_base")
+
+@st.cache_data(show_spinner=False)
+def count_tokens(text):
+    """Number of model tokens in text"""
+    return len(get_token_encoding().encode(text))
+
+def show_transcript_size(transcription):
+    """Show the transcript's token count before it is sent to the model"""
+    n_tokens = count_tokens(transcription)
+    note = " (long transcript, it will be condensed before analysis)" if n_tokens > MAX_TRANSCRIPT_TOKENS else ""
+    st.caption(f"Transcript size: {n_tokens:,} tokens{note}")
+
+def condense_window(text):
+    """Condense one window of a long transcript"""
     response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "system", "content": prompt}],
-        temperature=0.3
+        model=MODEL_EXTRACT,
+        messages=build_messages(CONDENSE_SYSTEM_PROMPT, text),
+        temperature=0
     )
     
     return response.choices[0].message.content
 
-# Simple transcription function for demo
-def process_peer_audio_for_summary_action(transcription_text):
-    """Process peer conversation for Summary and Action Plan output focused on regulation practices"""
-    prompt = f"""You are analyzing a peer-to-peer conversation between students discussing their regulation practices and SIG meeting feedback.
-
-Regulation skills refer to the ability to manage beliefs, emotions, and thoughts in a way that is effective for different situations and help you to achieve your long term goals.
-
-Based on the meeting transcript/recording provided, do the following:
-
-1) Write a 2-sentence summary of what was discussed. The purpose of the summary is to help the student see their progress and practices for the week.
-
-2) Create an action plan for the following week using bullet points. For the action plan, it should include:
-   - What the student did well in terms of regulation practices that they should keep building on
-   - How to incorporate feedback received from their meeting with the coach
-   - How to build upon their work they did well for the next week
-
-Here's the conversation:
-{transcription_text}
-
-Format your response exactly as:
-
-**Summary:**
-[2 sentences about what was discussed and their progress/practices]
+@st.cache_data(show_spinner=False, ttl=24 * 3600, max_entries=64)
+def condense_transcript(transcription):
+    """Return short transcripts unchanged; condense long ones window by window in parallel and join the notes"""
+    encoding = get_token_encoding()
+    tokens = encoding.encode(transcription)
+    if len(tokens) <= MAX_TRANSCRIPT_TOKENS:
+        return transcription
+    
+    windows = [
+        encoding.decode(tokens[i:i + TRANSCRIPT_WINDOW_TOKENS])
+        for i in range(0, len(tokens), TRANSCRIPT_WINDOW_TOKENS)
+    ]
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as pool:
+        return "\n\n".join(pool.map(condense_window, windows))
+
+def parse_json_response(response):
+    """Decode a JSON-mode completion, raising ValueError if it was cut off at the token cap or is malformed"""
+    choice = response.choices[0]
+    if choice.finish_reason == "length":
+        raise ValueError("the response was cut off before it was complete")
+    return json.loads(choice.message.content)
+
+def safe_extract(extract, *args):
+    """Run a JSON extraction, reporting an unreadable response with st.error and returning an empty result"""
+    try:
+        return extract(*args)
+    except ValueError as e:
+        # Raised inside the cached function, so the failure is not cached and a retry calls the API again
+        st.error(f"The analysis could not be read ({e}). Please try again.")
+        return {}
 
-**Action Plan:**
-• [What they did well in regulation practices to build on]
-• [How to incorporate coach feedback]
-• [How to build on this week's progress]
-• [Additional specific regulation practice steps]
-"""
+# Transcription summarization function for SIG meetings
+@st.cache_data(show_spinner=False, ttl=24 * 3600, max_entries=256)
+def summarize_transcription(transcription, meeting_type="SIG Meeting"):
+    """Summarize the transcription into {"title", "gap", "context", "plan", "coach_suggestion"} based on meeting type"""
+    system_prompt = SUMMARY_SYSTEM_PROMPTS.get(meeting_type, PEER_CONVERSATION_SYSTEM_PROMPT)
     
     response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "system", "content": prompt}],
-        temperature=0.3
+        model=MODEL_EXTRACT,
+        messages=build_messages(system_prompt, condense_transcript(transcription)),
+        temperature=0,
+        max_tokens=EXTRACTION_MAX_TOKENS,
+        response_format={"type": "json_object"}
     )
     
-    return response.choices[0].message.content
+    return parse_json_response(response)
+
+@st.cache_data(show_spinner=False, ttl=24 * 3600, max_entries=256)
+def process_peer_audio_for_summary_action(transcription_text):
+    """Process peer conversation into {"summary", "action_plan"} focused on regulation practices"""
+    response = client.chat.completions.create(
+        model=MODEL_EXTRACT,
+        messages=build_messages(SUMMARY_ACTION_SYSTEM_PROMPT, condense_transcript(transcription_text)),
+        temperature=0,
+        max_tokens=EXTRACTION_MAX_TOKENS,
+        response_format={"type": "json_object"}
+    )
+    
+    return parse_json_response(response)
+
+# Finished meeting summaries kept per process, bounded like the st.cache_data extraction results
+MEETING_SUMMARY_CACHE_SIZE = 256
+
+@st.cache_resource
+def get_meeting_summary_cache():
+    """Transcript -> finished meeting summary, shared across sessions and filled once a stream completes"""
+    return OrderedDict(), threading.Lock()
+
+def get_meeting_summary(transcription_text):
+    """Return the cached meeting summary for a transcript, or None if it hasn't been generated yet"""
+    summaries, lock = get_meeting_summary_cache()
+    with lock:
+        return summaries.get(transcription_text)
+
+def store_meeting_summary(transcription_text, summary):
+    """Cache a finished meeting summary, evicting the oldest once the cache is full"""
+    summaries, lock = get_meeting_summary_cache()
+    with lock:
+        summaries[transcription_text] = summary
+        while len(summaries) > MEETING_SUMMARY_CACHE_SIZE:
+            summaries.popitem(last=False)
+
+def start_meeting_summary_stream(transcription_text):
+    """Send the meeting summary request and return a generator of text deltas, or None if already cached"""
+    if get_meeting_summary(transcription_text) is not None:
+        return None
+    
+    # create() returns once the response starts, so the summary keeps generating server-side
+    # while the caller waits on other requests, and is drained later by st.write_stream
+    stream = client.chat.completions.create(
+        model=MODEL_NARRATIVE,
+        messages=build_messages(MEETING_SUMMARY_SYSTEM_PROMPT, condense_transcript(transcription_text)),
+        temperature=0.3,
+        stream=True
+    )
+    
+    return (chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices)
+
+def render_meeting_summary(transcription_text, summary_stream):
+    """Show the full meeting summary, streaming it in when it was just requested; returns the summary text"""
+    with st.expander("View Full Meeting Summary", expanded=summary_stream is not None):
+        if summary_stream is None:
+            summary = get_meeting_summary(transcription_text)
+            st.markdown(summary)
+        else:
+            summary = st.write_stream(summary_stream)
+            store_meeting_summary(transcription_text, summary)
+    return summary
+
+# Pre-transcribed sample conversations used by the demo buttons
+SAMPLES_DIR = Path(__file__).parent / "data" / "samples"
+
+@st.cache_data(show_spinner=False)
+def load_sample_transcript(name):
+    """Load a pre-transcribed sample conversation once and share it across reruns and sessions"""
+    return (SAMPLES_DIR / name).read_text(encoding="utf-8").strip()
+
+# Sample analyses are persisted here after their first run so later runs and restarts skip the API
+SAMPLE_RESULTS_DIR = Path(__file__).parent / "data" / "sample_results"
+
+def sample_result_path(*key_parts):
+    """Path of a persisted sample analysis, keyed by a hash of its prompts, model and transcript"""
+    digest = hashlib.sha256("\n".join(key_parts).encode("utf-8")).hexdigest()[:16]
+    return SAMPLE_RESULTS_DIR / f"{digest}.json"
+
+def load_sample_result(path, required_keys=()):
+    """Load a persisted sample analysis, or return None if it hasn't been generated yet
+    
+    A corrupt file or one missing any of required_keys also gives None, so the sample is re-analyzed.
+    """
+    if not path.is_file():
+        return None
+    try:
+        result = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError as e:
+        print(f"Ignoring unreadable sample analysis {path}: {e}")
+        return None
+    if not isinstance(result, dict) or any(key not in result for key in required_keys):
+        print(f"Ignoring incomplete sample analysis {path}")
+        return None
+    return result
+
+def save_sample_result(path, result):
+    """Persist a sample analysis so the next run loads it instead of calling the API"""
+    # Write to a per-process temp file and rename it into place, so a concurrent or
+    # interrupted save never leaves a partial file behind
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(json.dumps(result), encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # A read-only deployment still works, it just falls back to the cached API call
+        print(f"Could not save sample analysis to {path}: {e}")
+        tmp_path.unlink(missing_ok=True)
 
 # CSS for better styling
 st.markdown("""
@@ -209,52 +351,28 @@ st.markdown("""
         margin: 16px 0;
         box-shadow: 0 2px 8px rgba(245, 158, 11, 0.1);
     }
-    
-    .result-card {
-        background: white;
-        border: 1px solid #e5e7eb;
-        border-radius: 8px;
-        padding: 20px;
-        margin: 10px 0;
-        box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-    }
 </style>
 """, unsafe_allow_html=True)
 
-# MAIN UI LOGIC
-st.title("SPS V0.2 Prototype")
-
-# HOME PAGE
-if st.session_state.page == 'home':
-    st.markdown("### LLM Enabled Regulation Coaching System")
-    st.markdown("Choose your session type to get started:")
-    
-    # Two main option cards
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        if st.button("🎯 SIG Meeting\n\nUpload and analyze coach-student discussion audio for structured assessment and feedback", key="sig_card", help="Coach-Student Assessment Session", use_container_width=True):
-            go_to_sig_meeting()
-            st.rerun()
-    
-    with col2:
-        if st.button("👥 Peer Meeting\n\nConnect with matched peers and analyze peer-to-peer learning conversations", key="peer_card", help="Peer-to-Peer Learning Session", use_container_width=True):
-            go_to_peer_meeting()
-            st.rerun()
-
-# SIG MEETING PAGE
-elif st.session_state.page == 'sig_meeting':
-    # Back to home button
-    if st.button("← Back to Home", key="back_to_home_from_sig"):
-        go_to_home()
-        st.rerun()
-    
-    st.header("Upload Your SIG Meeting Audio")
-    st.write("Upload your coaching assessment audio file (MP3 format). The system will transcribe and organize your coach-student interaction into structured fields for review.")
-    
-    # Show estimated processing time
-    st.info("**Estimated processing time:** ~2 minutes for transcription and summarization")
-    
+def render_summary_action_cards(result):
+    """Show a peer analysis {"summary", "action_plan"} result as stacked bordered cards"""
+    # Model output is not guaranteed to match the schema: a lone string counts as one action item
+    summary = result.get("summary") or ""
+    action_plan = result.get("action_plan")
+    action_plan = [action_plan] if isinstance(action_plan, str) else action_plan or []
+    
+    with st.container(border=True):
+        st.markdown("#### 📝 Summary")
+        st.write(str(summary))
+    
+    with st.container(border=True):
+        st.markdown("#### 🎯 Action Plan")
+        st.markdown("\n".join(f"- {item}" for item in action_plan))
+
+# Analysis panels run as fragments so their buttons and uploaders rerun only the panel, not the whole page
+@st.fragment
+def render_sig_analysis():
+    """Sample run and audio upload panel of the SIG meeting page"""
     # Sample demo section
     st.markdown("---")
     st.subheader("See a Sample Run")
@@ -264,32 +382,18 @@ elif st.session_state.page == 'sig_meeting':
     
     if st.button("Run Sample Analysis", type="primary", use_container_width=True, key="sample_sig"):
         # Use pre-transcribed sample data for instant demo
-        sample_transcript = """So that led to our research, which is how do we scaffold a conversation, such as students ask better or deeper questions to their experienced peers, so that they can adjust their regulation gap? So just trying to come up with better question promptings so that we get better responses. I saw that. A couple things. First of all, I don't know if the bot's working, but did you get these reflection questions? I think there's a problem happening right now, but he gave us those. He sent it to us. OK, well, I can't see them, so. Oh, what it means is that if you do the reflections, yeah, they should show up here. Oh, oh, I see. OK, so I'm just letting you guys know. Well, I'm just letting you guys know. Yeah, it's not it's not. So I can't see your reflections on what you did. But we're going to keep working on. Keep working on articulating risks, so let's let's work on that a little bit. What? So right now, here's what I've heard so far. I heard we tested. Conversation went like, OK, but like maybe not so good or there's some parts like they could articulate certain things in the conversation. So we need to ask better questions. So we're going to ask better questions. That's roughly what I've heard. OK. If you're doing takeaways from user testing as you test it, it asks you to walk through. What is the new understanding that you've gained through testing with users? So often, you know, to talk about risk, it's really useful to talk about what you know, what you now know, and then to talk about what you still don't know. So it's nice to have both sides of that when you talk about a risk. So then, let's see, let's go through the sections of takeaways from user testing. Some of the first questions it asks are, what new understanding do you have? You know, there's the insights part, right? You guys know what I'm talking about when I'm saying all this, right? If you're no longer following, just pause me and then we'll put up and we'll look together. So it's like quick insights. And then it gets into like, well, did you learn anything new about the users? Like, what are their goals or what are their obstacles? And in particular, right, again, obstacles are not just what can't they do, but about why do they struggle to do the things that we want them to do or that they want to do, right? So it's understanding those why's. And then, you know, from there, there's things what you learn about your design and where it's working, where it's not. So I'm curious. So the first part about obstacles is, I haven't heard anything about why they struggle to do certain things, right? Like why are they bad at articulating their issues and the regulation gaps and what new things have you learned about that? Does that make sense? So that's something I'm curious about. And then on the solution side, well, you have some design arguments. Like there's some way you're trying to facilitate a conversation. So what did you learn about, right? And you had an argument about why they shouldn't get over the obstacles you thought were challenges. Do you need something? Well, not contagious. I've just been having a cough. She's been like that for two weeks. Sorry. So obstacles. And then what are the characteristics of your tool that's supposed to facilitate conversations along these lines? I'm assuming they're not working. This is still happening. But why aren't they working? Because you had an argument for why they should have worked and what obstacles they should have gotten over. So was there a new obstacle you didn't anticipate? Or is it that your argument about why it would get over the current obstacle didn't work? And so from there, I'm still walking you down takeaways from user testing. There's going to be something about your testing setup. So the question is about, is your testing setup helping you understand the things you want to understand? And some of it, the questions I just asked you about the obstacles, about how the design argument is working, it's possible. That your testing setup allowed you to understand those things or made it really hard to actually understand those things. So you saw that they were bad at articulating, but you don't really understand why. You saw that the argument didn't work, but you don't really understand which specific part of the argument broke down. And that might suggest that the testing setup has to be improved. So I'll just pause there. Does that all make sense? Any questions about any of that? I'm not asking you what to do about it yet, but does that all make sense? Okay, so good. So let's go back to here, right? And I know this is like a week ago, a week ago. But still, to help us follow along with your story, because this very quickly jumped into, they're bad at this, so let's just fix this. What were you able to learn about the things, about obstacles, about the design argument, about the testing setup? And are there anything there that are important for us to be thinking about as we tackle this question? Because now it just basically says, it didn't work, so we need to do better. It's not very helpful. I think one of the ways I think about this is, imagine you don't get the design, you just get to present the takeaways. Does that make sense? So you present the takeaways, let's say, to Lynn and Grace, and you tell them, well, students are bad at articulating, go make better questions. So they're sitting there and they're like, okay, great, we got to make better questions, but they're like, you want to tell us what would help us make better questions? Because without it, how are they going to do any better than they did on the last attempt? Okay, good, so let's try again, and if you don't have the answers to some of these questions, that's good too, but that might tell us something about the testing setup, right? So one way or another, we're going to learn something."""
+        sample_transcript = load_sample_transcript("sig_transcript.txt")
+        show_transcript_size(sample_transcript)
         
         # Process sample transcript with real analysis
         with st.spinner("Analyzing sample transcript..."):
-            # Summarize the sample transcription
-            summary = summarize_transcription(sample_transcript, "SIG Meeting")
-            
-            # Parse the summary to extract components
-            lines = summary.split('\n')
-            extracted_title = ""
-            extracted_gap = ""
-            extracted_context = ""
-            extracted_plan = ""
-            extracted_coach_suggestion = ""
-            
-            for line in lines:
-                if "Assessment Title:" in line or "**Assessment Title:**" in line:
-                    extracted_title = line.split("Assessment Title:")[-1].replace("**", "").strip()
-                elif "Gap (What needs improvement):" in line or "**Gap (What needs improvement):**" in line:
-                    extracted_gap = line.split("Gap (What needs improvement):")[-1].replace("**", "").strip()
-                elif "Context:" in line or "**Context:**" in line:
-                    extracted_context = line.split("Context:")[-1].replace("**", "").strip()
-                elif "Plan & Reflect:" in line or "**Plan & Reflect:**" in line:
-                    extracted_plan = line.split("Plan & Reflect:")[-1].replace("**", "").strip()
-                elif "Coach Practice Suggestion:" in line or "**Coach Practice Suggestion:**" in line:
-                    extracted_coach_suggestion = line.split("Coach Practice Suggestion:")[-1].replace("**", "").strip()
+            # Load the persisted sample analysis, or summarize the sample transcription into structured fields once
+            sample_path = sample_result_path(MODEL_EXTRACT, SIG_SYSTEM_PROMPT, sample_transcript)
+            analysis = load_sample_result(sample_path)
+            if analysis is None:
+                analysis = safe_extract(summarize_transcription, sample_transcript, "SIG Meeting")
+                if analysis:
+                    save_sample_result(sample_path, analysis)
             
             st.success("Sample analysis complete!")
             
@@ -297,14 +401,16 @@ elif st.session_state.page == 'sig_meeting':
             st.markdown("---")
             st.subheader("Sample SIG Meeting Analysis Results")
             
-            st.write(f"**Assessment Title:** {extracted_title if extracted_title else 'Sample Assessment'}")
-            st.write(f"**Gap (What needs improvement):** {extracted_gap}")
-            st.write(f"**Context:** {extracted_context}")
-            st.write(f"**Plan & Reflect:** {extracted_plan}")
-            st.write(f"**Coach Practice Suggestion:** {extracted_coach_suggestion}")
+            st.markdown(
+                f"**Assessment Title:** {analysis.get('title') or 'Sample Assessment'}\n\n"
+                f"**Gap (What needs improvement):** {analysis.get('gap', '')}\n\n"
+                f"**Context:** {analysis.get('context', '')}\n\n"
+                f"**Plan & Reflect:** {analysis.get('plan', '')}\n\n"
+                f"**Coach Practice Suggestion:** {analysis.get('coach_suggestion', '')}"
+            )
             
             with st.expander("View Full AI Analysis"):
-                st.markdown(summary)
+                st.json(analysis)
     
     st.markdown("---")
     st.subheader("Upload Your Own Audio")
@@ -327,48 +433,9 @@ elif st.session_state.page == 'sig_meeting':
         if st.button("🎯 Transcribe & Summarize Audio", key="transcribe_sig", type="primary"):
             st.success("Would transcribe and process through existing SIG Meeting workflow.")
 
-# PEER MEETING PAGE
-elif st.session_state.page == 'peer_meeting':
-    # Back to home button
-    if st.button("← Back to Home", key="back_to_home_from_peer"):
-        go_to_home()
-        st.rerun()
-    
-    st.header("Peer Meeting Session")
-    
-    # Show simple instruction
-    st.info("👥 **Meet with your SIG mates.**")
-    
-    # Checklist Questions Card
-    st.subheader("Discussion Checklist")
-    st.warning("""
-📋 **Peer Conversation Guidelines**
-
-Use these questions to guide your peer discussion:
-
-**About Your Work:**
-• Describe your deliverable
-• Describe how you worked that week leading up to your SIG meeting  
-• What do you think you did well in terms of regulation practices?
-• How might that have contributed to your deliverable?
-• Why did you work that way and apply certain strategies?
-• Did you do anything differently compared to previous weeks that made you more effective?
-
-**About Feedback:**
-• Describe the feedback you received during your SIG meeting
-• How do you think the feedback relates to how you practiced that week?
-• Did you receive any positive feedback from the coach yet? What did that look like?
-• Overall, how do you feel about your week's progress after the SIG meeting compared to before the SIG meeting?
-
-**About Next Steps:**
-• Describe what your next steps will be for the following week
-• What is one thing that you did well this week relating to regulation practices that you want to incorporate into next week?
-• How will you also incorporate the feedback from the SIG meeting?
-• How (if possible) can you build on this week's progress for next week?
-
-*Record your conversation and upload it below for analysis.*
-    """)
-    
+@st.fragment
+def render_peer_analysis():
+    """Sample run and audio upload panel of the peer meeting page"""
     # Sample demo section
     st.markdown("---")
     st.subheader("See a Sample Run")
@@ -378,37 +445,23 @@ Use these questions to guide your peer discussion:
     
     if st.button("Run Sample Analysis", type="primary", use_container_width=True, key="sample_peer"):
         # Use pre-transcribed sample peer conversation for instant demo
-        sample_peer_transcript = """
-Student A: So this week for my deliverable, I had to present our user research findings to the team. I've been working on managing my perfectionism because I usually get paralyzed by wanting everything to be perfect before I share it.
-
-Student B: Oh wow, how did that go? I remember you mentioning that was something you wanted to work on after your SIG meeting.
-
-Student A: Actually, it went better than expected! My coach had told me to try the "good enough to get feedback" approach this week. So instead of spending days perfecting the presentation, I set a timer for 3 hours to create a rough version and then shared it for input.
-
-Student B: That's awesome! I've been dealing with similar regulation challenges around procrastination. After my SIG meeting, my coach pointed out that I wait until the last minute because I'm afraid of not meeting my own high standards.
-
-Student A: Yes! That's exactly it. What did you do differently this week?
-
-Student B: I tried breaking my project into smaller chunks and celebrating small wins. Instead of thinking "I need to finish this entire prototype," I told myself "today I just need to complete the wireframes." It helped manage that overwhelming feeling.
-
-Student A: That's smart. My coach also suggested I notice when I'm getting stuck in perfectionist thinking. This week I caught myself three times starting to over-research instead of just starting to write. Each time I reminded myself that feedback is more valuable than perfection.
-
-Student B: How did your team respond when you shared the rough version?
-
-Student A: They actually loved the collaborative approach! They had suggestions that made the final version way better than if I had tried to perfect it alone. My coach was right - the feedback was more valuable than my perfectionism.
-
-Student B: That's amazing progress. For next week, I want to keep practicing that small-wins approach. But I also got feedback that I need to communicate my progress better to my team instead of just working in isolation.
-
-Student A: Yeah, I think for me, I want to keep using that timer method and also practice sharing work-in-progress more often. It felt scary but it worked so much better.
-        """
+        sample_peer_transcript = load_sample_transcript("peer_transcript.txt")
+        show_transcript_size(sample_peer_transcript)
         
         # Process sample transcript with real analysis
         with st.spinner("Analyzing sample peer conversation..."):
-            # Process for Summary and Action Plan
-            result = process_peer_audio_for_summary_action(sample_peer_transcript)
+            # Reuse the persisted sample analysis when it has been generated before
+            sample_path = sample_result_path(
+                MODEL_EXTRACT, MODEL_NARRATIVE, SUMMARY_ACTION_SYSTEM_PROMPT, MEETING_SUMMARY_SYSTEM_PROMPT,
+                sample_peer_transcript
+            )
+            saved = load_sample_result(sample_path, required_keys=("result", "meeting_summary"))
+            if saved is not None:
+                store_meeting_summary(sample_peer_transcript, saved["meeting_summary"])
             
-            # Generate detailed meeting summary for expandable section
-            meeting_summary = generate_meeting_summary(sample_peer_transcript)
+            # Start the detailed meeting summary, then process for Summary and Action Plan while it generates
+            summary_stream = start_meeting_summary_stream(sample_peer_transcript)
+            result = saved["result"] if saved is not None else safe_extract(process_peer_audio_for_summary_action, sample_peer_transcript)
             
             st.success("Sample peer analysis complete!")
             
@@ -416,43 +469,15 @@ Student A: Yeah, I think for me, I want to keep using that timer method and also
             st.markdown("---")
             st.subheader("Sample Peer Analysis Results")
             
-            # Parse the response to separate Summary and Action Plan
-            lines = result.split('\n')
-            summary_section = []
-            action_section = []
-            current_section = None
-            
-            for line in lines:
-                line = line.strip()
-                if '**Summary:**' in line:
-                    current_section = 'summary'
-                    continue
-                elif '**Action Plan:**' in line:
-                    current_section = 'action'
-                    continue
-                elif line:  # Skip empty lines
-                    if current_section == 'summary':
-                        summary_section.append(line)
-                    elif current_section == 'action':
-                        action_section.append(line)
+            render_summary_action_cards(result)
             
-            # Display Summary and Action Plan as stacked sections
-            st.markdown("""
-            <div class="result-card">
-                <h4>📝 Summary</h4>
-                <div>{}</div>
-            </div>
-            """.format('<br>'.join(summary_section)), unsafe_allow_html=True)
+            meeting_summary = render_meeting_summary(sample_peer_transcript, summary_stream)
             
-            st.markdown("""
-            <div class="result-card">
-                <h4>🎯 Action Plan</h4>
-                <div>{}</div>
-            </div>
-            """.format('<br>'.join(action_section)), unsafe_allow_html=True)
-            
-            with st.expander("View Full Meeting Summary"):
-                st.markdown(meeting_summary)
+            if saved is None and result:
+                save_sample_result(sample_path, {
+                    "result": result,
+                    "meeting_summary": meeting_summary
+                })
     
     st.markdown("---")
     st.subheader("Upload Your Own Audio")
@@ -480,31 +505,12 @@ Student A: Yeah, I think for me, I want to keep using that timer method and also
         if st.button("🎯 Transcribe & Analyze Peer Conversation", key="transcribe_analyze_peer", type="primary"):
             with st.spinner("Processing peer conversation..."):
                 # Mock transcription for demo - regulation practices focused
-                mock_transcription = """
-Student A: This week I worked on my design research project. I think I did well with managing my perfectionism by setting daily deadlines instead of trying to make everything perfect. My coach suggested this strategy last week.
-
-Student B: That's really good! I can relate to that struggle. This week I focused on my presentation skills, and I practiced managing my anxiety by doing breathing exercises before practice sessions. My coach gave me feedback about how my nervousness was affecting my message clarity.
-
-Student A: Did the breathing exercises help? I'm curious because I get really anxious about presenting too.
-
-Student B: Yes, definitely! When I managed my anxiety better, I could focus on organizing my thoughts clearly. My coach was right that my rushing through slides was actually making things worse, not better.
-
-Student A: That makes sense. My coach also pointed out that my perfectionism was actually slowing me down rather than improving quality. So this week I practiced her suggestion about setting "good enough" standards for drafts.
-
-Student B: How did that work for your research project?
-
-Student A: Much better! I finished my user interviews on time and had energy left to analyze the data properly. I'm getting better at recognizing when my emotions are driving my decisions instead of strategic thinking.
-
-Student B: I want to keep building on the anxiety management techniques next week, and also try my coach's suggestion about rehearsing presentations with a timer to practice staying within time limits.
-
-Student A: Good plan. I want to continue with the "good enough" draft strategy and also work on my coach's feedback about asking better follow-up questions during interviews.
-                """
-                
-                # Process for Summary and Action Plan
-                result = process_peer_audio_for_summary_action(mock_transcription)
+                mock_transcription = load_sample_transcript("peer_mock_transcript.txt")
+                show_transcript_size(mock_transcription)
                 
-                # Generate detailed meeting summary for expandable section
-                meeting_summary = generate_meeting_summary(mock_transcription)
+                # Start the detailed meeting summary, then process for Summary and Action Plan while it generates
+                summary_stream = start_meeting_summary_stream(mock_transcription)
+                result = safe_extract(process_peer_audio_for_summary_action, mock_transcription)
                 
                 st.success("Peer conversation analysis complete!")
                 
@@ -512,40 +518,80 @@ Student A: Good plan. I want to continue with the "good enough" draft strategy a
                 st.markdown("---")
                 st.subheader("Analysis Results")
                 
-                # Parse the response to separate Summary and Action Plan
-                lines = result.split('\n')
-                summary_section = []
-                action_section = []
-                current_section = None
+                render_summary_action_cards(result)
                 
-                for line in lines:
-                    line = line.strip()
-                    if '**Summary:**' in line:
-                        current_section = 'summary'
-                        continue
-                    elif '**Action Plan:**' in line:
-                        current_section = 'action'
-                        continue
-                    elif line:  # Skip empty lines
-                        if current_section == 'summary':
-                            summary_section.append(line)
-                        elif current_section == 'action':
-                            action_section.append(line)
-                
-                # Display Summary and Action Plan as stacked sections
-                st.markdown("""
-                <div class="result-card">
-                    <h4>📝 Summary</h4>
-                    <div>{}</div>
-                </div>
-                """.format('<br>'.join(summary_section)), unsafe_allow_html=True)
-                
-                st.markdown("""
-                <div class="result-card">
-                    <h4>🎯 Action Plan</h4>
-                    <div>{}</div>
-                </div>
-                """.format('<br>'.join(action_section)), unsafe_allow_html=True)
-                
-                with st.expander("View Full Meeting Summary"):
-                    st.markdown(meeting_summary)
\ No newline at end of file
+                render_meeting_summary(mock_transcription, summary_stream)
+
+# MAIN UI LOGIC
+st.title("SPS V0.2 Prototype")
+
+page = current_page()
+
+# HOME PAGE
+if page == 'home':
+    st.markdown("### LLM Enabled Regulation Coaching System")
+    st.markdown("Choose your session type to get started:")
+    
+    # Two main option cards
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.button("🎯 SIG Meeting\n\nUpload and analyze coach-student discussion audio for structured assessment and feedback", key="sig_card", help="Coach-Student Assessment Session", use_container_width=True, on_click=go_to_sig_meeting)
+    
+    with col2:
+        st.button("👥 Peer Meeting\n\nConnect with matched peers and analyze peer-to-peer learning conversations", key="peer_card", help="Peer-to-Peer Learning Session", use_container_width=True, on_click=go_to_peer_meeting)
+
+# SIG MEETING PAGE
+elif page == 'sig_meeting':
+    # Back to home button
+    st.button("← Back to Home", key="back_to_home_from_sig", on_click=go_to_home)
+    
+    st.header("Upload Your SIG Meeting Audio")
+    st.write("Upload your coaching assessment audio file (MP3 format). The system will transcribe and organize your coach-student interaction into structured fields for review.")
+    
+    # Show estimated processing time
+    st.info("**Estimated processing time:** ~2 minutes for transcription and summarization")
+    
+    render_sig_analysis()
+
+# PEER MEETING PAGE
+elif page == 'peer_meeting':
+    # Back to home button
+    st.button("← Back to Home", key="back_to_home_from_peer", on_click=go_to_home)
+    
+    st.header("Peer Meeting Session")
+    
+    # Show simple instruction
+    st.info("👥 **Meet with your SIG mates.**")
+    
+    # Checklist Questions Card
+    st.subheader("Discussion Checklist")
+    st.warning("""
+📋 **Peer Conversation Guidelines**
+
+Use these questions to guide your peer discussion:
+
+**About Your Work:**
+• Describe your deliverable
+• Describe how you worked that week leading up to your SIG meeting  
+• What do you think you did well in terms of regulation practices?
+• How might that have contributed to your deliverable?
+• Why did you work that way and apply certain strategies?
+• Did you do anything differently compared to previous weeks that made you more effective?
+
+**About Feedback:**
+• Describe the feedback you received during your SIG meeting
+• How do you think the feedback relates to how you practiced that week?
+• Did you receive any positive feedback from the coach yet? What did that look like?
+• Overall, how do you feel about your week's progress after the SIG meeting compared to before the SIG meeting?
+
+**About Next Steps:**
+• Describe what your next steps will be for the following week
+• What is one thing that you did well this week relating to regulation practices that you want to incorporate into next week?
+• How will you also incorporate the feedback from the SIG meeting?
+• How (if possible) can you build on this week's progress for next week?
+
+*Record your conversation and upload it below for analysis.*
+    """)
+    
+    render_peer_analysis()
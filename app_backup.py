@@ -1,52 +1,43 @@
 import streamlit as st
 import json
-import pandas as pd
+import re
 from pathlib import Path
 import os
 import numpy as np
 from dotenv import load_dotenv
-import time
+from openai import OpenAI, AsyncOpenAI
 import io
+import asyncio
+import hashlib
 
-# Load environment variables (for local development)
-load_dotenv()
-
-# Try alternative import approach with better secrets handling
+# orjson is optional; without it case studies are parsed with the stdlib json module
 try:
-    from openai import OpenAI
-    
-    # Handle secrets more gracefully
-    api_key = None
-    try:
-        # Try to get from Streamlit secrets first (for cloud deployment)
-        api_key = st.secrets["openai"]["OPENAI_API_KEY"]
-    except (FileNotFoundError, KeyError):
-        # Fall back to environment variable (for local development)
-        api_key = os.getenv("OPENAI_API_KEY")
-    
-    if not api_key:
-        st.error("OpenAI API key not found. Please set OPENAI_API_KEY in your .env file or Streamlit secrets.")
-        st.stop()
-    
-    client = OpenAI(api_key=api_key)
-    
+    import orjson
 except ImportError:
-    # Fallback to older API
-    import openai
-    
-    # Handle secrets more gracefully for older API
-    api_key = None
+    orjson = None
+
+# Load environment variables (for local development); skip the .env lookup when already set
+if not os.getenv("OPENAI_API_KEY"):
+    load_dotenv()
+
+@st.cache_resource
+def get_openai_client(api_key):
+    """Create the OpenAI client once per API key so reruns reuse its connection pool"""
+    return OpenAI(api_key=api_key)
+
+def resolve_api_key():
+    """Read the OpenAI API key from Streamlit secrets (cloud) or the environment (local development)"""
     try:
-        api_key = st.secrets["openai"]["OPENAI_API_KEY"]
+        return st.secrets["openai"]["OPENAI_API_KEY"]
     except (FileNotFoundError, KeyError):
-        api_key = os.getenv("OPENAI_API_KEY")
-    
-    if not api_key:
-        st.error("OpenAI API key not found. Please set OPENAI_API_KEY in your .env file or Streamlit secrets.")
-        st.stop()
-    
-    openai.api_key = api_key
-    client = openai
+        return os.getenv("OPENAI_API_KEY")
+
+api_key = resolve_api_key()
+if not api_key:
+    st.error("OpenAI API key not found. Please set OPENAI_API_KEY in your .env file or Streamlit secrets.")
+    st.stop()
+
+client = get_openai_client(api_key)
 
 # Initialize session state for tracking UI flow
 if 'page' not in st.session_state:
@@ -61,6 +52,10 @@ if 'similar_cases' not in st.session_state:
 if 'current_template' not in st.session_state:
     st.session_state.current_template = None
 
+# current_template split into sections, parsed once per generated template
+if 'template_sections' not in st.session_state:
+    st.session_state.template_sections = None
+
 if 'student_note' not in st.session_state:
     st.session_state.student_note = None
 
@@ -82,61 +77,62 @@ if 'meeting_type' not in st.session_state:
 if 'matched_peer' not in st.session_state:
     st.session_state.matched_peer = None
 
-# Add new session state for tracking expanded case
-if 'expanded_case' not in st.session_state:
-    st.session_state.expanded_case = None
+# "How This Applies To You" text per similar case, keyed on case id
+if 'strategies_by_case_id' not in st.session_state:
+    st.session_state.strategies_by_case_id = {}
 
-# Load the codebook for gap analysis
-def load_codebook():
-    """Load the regulation gap codebook from various possible locations"""
+# Suggested discussion questions per similar case, keyed on case id
+if 'questions_by_case_id' not in st.session_state:
+    st.session_state.questions_by_case_id = {}
+
+# Resolve a data or template file once, checking the same locations as before
+@st.cache_data(show_spinner=False)
+def find_data_file(relative_path):
+    """Return the first existing location of a file under data/ or templates/"""
     possible_paths = [
-        "data/codebook.txt",                    # Root directory
-        "peer2peer/data/codebook.txt",          # From root running in peer2peer subfolder
-        "../data/codebook.txt",                 # One level up (if running from peer2peer)
-        os.path.join(os.path.dirname(__file__), "data/codebook.txt")  # Relative to script location
+        relative_path,                                          # Current directory
+        f"peer2peer/{relative_path}",                           # From root running in peer2peer subfolder
+        f"../{relative_path}",                                  # One level up (if running from peer2peer)
+        os.path.join(os.path.dirname(__file__), relative_path)  # Relative to script location
     ]
     
     for path in possible_paths:
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                print(f"Successfully loaded codebook from: {path}")
-                return f.read()
-        except FileNotFoundError:
-            continue
+        if Path(path).is_file():
+            return Path(path)
     
     # If we get here, we couldn't find the file
     raise FileNotFoundError(
-        "Could not find codebook.txt in any of these locations: " + 
+        f"Could not find {Path(relative_path).name} in any of these locations: " + 
         ", ".join(possible_paths) + 
         ". Please ensure the file exists in one of these locations."
     )
 
-# Load case studies 
+# Load the codebook for gap analysis (read once per process, not on every rerun)
+@st.cache_data(show_spinner=False)
+def load_codebook():
+    """Load the regulation gap codebook from various possible locations"""
+    path = find_data_file("data/codebook.txt")
+    print(f"Successfully loaded codebook from: {path}")
+    return path.read_text(encoding="utf-8")
+
+def parse_json(raw):
+    """Parse a JSON document (str or bytes) with orjson when available, else the stdlib"""
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+# Case fields the app reads; anything else in the case file (e.g. original_text) is dropped at load
+CASE_FIELDS = ("id", "project", "gap_text", "other_content", "tier1_categories", "tier2_categories")
+
+# Load case studies once per process; cache_resource hands every rerun the same list instead of a copy
+@st.cache_resource(show_spinner=False)
 def load_case_studies():
     """Load the tiered weighted cases from various possible locations"""
-    possible_paths = [
-        "data/tiered_weighted_cases.json",                    # Root directory
-        "peer2peer/data/tiered_weighted_cases.json",          # From root running in peer2peer subfolder
-        "../data/tiered_weighted_cases.json",                 # One level up (if running from peer2peer)
-        os.path.join(os.path.dirname(__file__), "data/tiered_weighted_cases.json")  # Relative to script location
-    ]
-    
-    for path in possible_paths:
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                print(f"Successfully loaded case studies from: {path}")
-                return json.load(f)
-        except FileNotFoundError:
-            continue
-    
-    # If we get here, we couldn't find the file
-    raise FileNotFoundError(
-        "Could not find tiered_weighted_cases.json in any of these locations: " + 
-        ", ".join(possible_paths) + 
-        ". Please ensure the file exists in one of these locations."
-    )
+    path = find_data_file("data/tiered_weighted_cases.json")
+    print(f"Successfully loaded case studies from: {path}")
+    cases = parse_json(path.read_bytes())
+    return [{field: case[field] for field in CASE_FIELDS if field in case} for case in cases]
 
-# Load templates based on gap type
+# Load templates based on gap type (templates never change at runtime)
+@st.cache_data(show_spinner=False)
 def load_template(gap_type="base"):
     """Load the appropriate template based on gap type"""
     template_mapping = {
@@ -145,140 +141,215 @@ def load_template(gap_type="base"):
     }
     
     template_file = template_mapping.get(gap_type, "base_template.md")
-    possible_paths = [
-        f"templates/{template_file}",                    # Current directory
-        f"peer2peer/templates/{template_file}",          # From root running in peer2peer subfolder
-        f"../templates/{template_file}",                 # One level up (if running from peer2peer)
-        os.path.join(os.path.dirname(__file__), f"templates/{template_file}")  # Relative to script
-    ]
-    
-    for path in possible_paths:
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                print(f"Successfully loaded template from: {path}")
-                return f.read()
-        except FileNotFoundError:
-            continue
-    
-    # If we get here, we couldn't find the file
-    raise FileNotFoundError(
-        f"Could not find template file {template_file} in any of these locations: " + 
-        ", ".join(possible_paths) + 
-        ". Please ensure the file exists in one of these locations."
-    )
+    path = find_data_file(f"templates/{template_file}")
+    print(f"Successfully loaded template from: {path}")
+    return path.read_text(encoding="utf-8")
 
 # Initialize data
 CODEBOOK = load_codebook()
 case_studies = load_case_studies()
-
-# Pre-compute embeddings for cases (in production, store these)
-@st.cache_resource
-def get_case_embeddings():
-    embeddings = {}
-    for case in case_studies:
-        case_text = f"{case.get('tier1_categories', '')} {case.get('tier2_categories', '')} {case.get('gap_text', '')} {case.get('other_content', '')}"
+CASE_BY_ID = {case["id"]: case for case in case_studies}
+
+# Text embedded for a case; queries are built the same way so both sides stay comparable.
+# Bump the version whenever the text format changes so saved case embeddings are rebuilt
+CASE_TEXT_VERSION = 3
+
+def build_case_text(case):
+    """Join the non-empty category and gap fields of a case (or query) into one embedding input"""
+    fields = (case.get('tier1_categories'), case.get('tier2_categories'), case.get('gap_text'), case.get('other_content'))
+    # Collapse whitespace before dropping empty fields, so blank fields add no separator
+    normalized = (" ".join(str(field).split()) for field in fields if field is not None)
+    return " ".join(text for text in normalized if text)
+
+# Embedding model shared by the case bank and queries; text-embedding-3 models can be
+# shortened to fewer dimensions, which keeps top-k recall while shrinking the case matrix
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 512
+
+# Chat models: diagnosis is kept separate so it can move to a stronger model on its own,
+# while the template/strategy/question generators and summaries stay on the fast tier
+MODEL_DIAGNOSE = "gpt-4o-mini"
+MODEL_FAST = "gpt-4o-mini"
+
+# Number of case texts sent per embeddings request
+EMBEDDING_BATCH_SIZE = 256
+
+# Pre-compute embeddings for cases, persisted next to the case file so restarts skip the API;
+# get_case_index caches whichever search structure is built from them
+def load_case_embeddings():
+    """Return the case ids and a parallel (N, d) float32 matrix of unit-length embeddings"""
+    case_ids = [case["id"] for case in case_studies]
+    
+    # Saved embeddings are keyed on the case file contents, the case text format and the embedding model and size
+    cases_path = find_data_file("data/tiered_weighted_cases.json")
+    model_key = f"{EMBEDDING_MODEL}:{EMBEDDING_DIMENSIONS}:text-v{CASE_TEXT_VERSION}".encode("utf-8")
+    bank_hash = hashlib.sha256(cases_path.read_bytes() + model_key).hexdigest()[:16]
+    embeddings_path = cases_path.parent / f"embeddings_{bank_hash}.npy"
+    if embeddings_path.is_file():
+        try:
+            saved = np.load(embeddings_path)
+        except (OSError, ValueError, EOFError) as e:
+            saved = None
+            print(f"Could not read saved case embeddings {embeddings_path}: {e}")
+        # A truncated or mismatched file counts as a miss and is rebuilt below
+        if saved is not None and saved.shape == (len(case_ids), EMBEDDING_DIMENSIONS):
+            print(f"Successfully loaded case embeddings from: {embeddings_path}")
+            return case_ids, saved
+    
+    case_texts = [build_case_text(case) for case in case_studies]
+    
+    # The embeddings endpoint accepts a list of inputs, so send cases in batches
+    embeddings = []
+    for start in range(0, len(case_texts), EMBEDDING_BATCH_SIZE):
         response = client.embeddings.create(
-            input=case_text,
-            model="text-embedding-ada-002"
+            input=case_texts[start:start + EMBEDDING_BATCH_SIZE],
+            model=EMBEDDING_MODEL,
+            dimensions=EMBEDDING_DIMENSIONS
         )
-        embeddings[case["id"]] = response.data[0].embedding
-    return embeddings
+        embeddings.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+    
+    embeddings_matrix = np.stack(embeddings).astype(np.float32)
+    # Normalize once so cosine similarity is a plain dot product at query time
+    embeddings_matrix /= np.linalg.norm(embeddings_matrix, axis=1, keepdims=True)
+    
+    # Write to a per-process temp file and rename it into place, so an interrupted or
+    # concurrent save never leaves a partial file at the final path
+    tmp_path = embeddings_path.with_name(f"{embeddings_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            np.save(f, embeddings_matrix)
+        os.replace(tmp_path, embeddings_path)
+    except OSError as e:
+        # A read-only deployment still works, it just re-embeds on the next cold start
+        print(f"Could not save case embeddings to {embeddings_path}: {e}")
+        tmp_path.unlink(missing_ok=True)
+    
+    return case_ids, embeddings_matrix
+
+@st.cache_resource
+def get_case_index():
+    """Return the case ids with an inner-product FAISS index over their embeddings, or None and the
+    float32 embedding matrix for NumPy search when FAISS is not installed"""
+    case_ids, embeddings_matrix = load_case_embeddings()
+    # FAISS is optional and slow to import, so it is only loaded when the first search builds the index;
+    # without it similar-case search falls back to NumPy
+    try:
+        import faiss
+    except ImportError:
+        return case_ids, None, embeddings_matrix
+    # Store vectors as float16 to halve index memory; queries are still scored in float32.
+    # Only the index is kept, so the float32 matrix is released once it has been added
+    index = faiss.IndexScalarQuantizer(
+        embeddings_matrix.shape[1],
+        faiss.ScalarQuantizer.QT_fp16,
+        faiss.METRIC_INNER_PRODUCT
+    )
+    index.add(embeddings_matrix)
+    return case_ids, index, None
+
+def join_categories(value):
+    """Return a category field as comma-separated text, whether the model sent a string or a list"""
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    return value or ""
+
+# Diagnosis instructions with the codebook first; the note goes in a separate user message so
+# this long prefix is identical across calls and eligible for OpenAI's automatic prompt caching
+DIAGNOSIS_SYSTEM_PROMPT = f"""You are analyzing a student's learning regulation gap.
+
+Based on the following codebook:
+{CODEBOOK}
+
+Analyze the student note in the user message and identify the primary regulation gaps.
+
+Remember to focus primarily (80%) on the assessment part of the note when categorizing, as this is the coach's perceived regulation gap. Be careful not to categorize the implications of the regulation gap.
+
+First, provide your step-by-step reasoning, then list the categories that apply.
+
+Reply with a JSON object with these string keys:
+"reasoning": your step-by-step reasoning
+"tier1_categories": comma-separated categories
+"tier2_categories": comma-separated subcategories
+"""
 
 # Main app functions
+@st.cache_data(show_spinner=False, ttl=3600)
 def diagnose_regulation_gap(student_note):
     """Use Claude/GPT to diagnose the regulation gap based on the codebook"""
-    prompt = f"""You are analyzing a student's learning regulation gap.
-    
-    Based on the following codebook:
-    {CODEBOOK}
-    
-    Analyze this student note and identify the primary regulation gaps:
-    {student_note}
-    
-    Remember to focus primarily (80%) on the assessment part of the note when categorizing, as this is the coach's perceived regulation gap. Be careful not to categorize the implications of the regulation gap.
-    
-    First, provide your step-by-step reasoning, then list the categories that apply.
-    
-    Provide your response in this format:
-    Reasoning: [your step-by-step reasoning]
-    Tier 1 Categories: [comma-separated categories]
-    Tier 2 Categories: [comma-separated subcategories]
-    """
-    
     response = client.chat.completions.create(
-        model="gpt-4o-mini",  # Much cheaper than gpt-4
-        messages=[{"role": "system", "content": prompt}],
-        temperature=0.2
+        model=MODEL_DIAGNOSE,
+        messages=[
+            {"role": "system", "content": DIAGNOSIS_SYSTEM_PROMPT},
+            {"role": "user", "content": student_note}
+        ],
+        temperature=0.2,
+        response_format={"type": "json_object"}
     )
     
-    analysis = response.choices[0].message.content
-    
-    # Extract tier 1 and tier 2 categories
-    tier1 = None
-    tier2 = None
-    reasoning = None
-    
-    for line in analysis.split('\n'):
-        if line.startswith("Tier 1 Categories:"):
-            tier1 = line.replace("Tier 1 Categories:", "").strip()
-        elif line.startswith("Tier 2 Categories:"):
-            tier2 = line.replace("Tier 2 Categories:", "").strip()
-        elif line.startswith("Reasoning:"):
-            reasoning = line.replace("Reasoning:", "").strip()
-        # Also check for the alternative format from codebook
-        elif line.startswith("Categories:"):
-            categories = line.replace("Categories:", "").strip().split()
-            if len(categories) >= 1:
-                if not tier1:  # Only set if not already set
-                    tier1 = categories[0]
-            if len(categories) >= 2:
-                if not tier2:  # Only set if not already set
-                    tier2 = " ".join(categories[1:])
-    
-    return {
-        "tier1_categories": tier1,
-        "tier2_categories": tier2,
-        "reasoning": reasoning,
-        "full_analysis": analysis
+    data = parse_json(response.choices[0].message.content)
+    fields = {
+        "reasoning": data.get("reasoning") or "",
+        "tier1_categories": join_categories(data.get("tier1_categories")),
+        "tier2_categories": join_categories(data.get("tier2_categories")),
     }
-
-def find_similar_cases(tier1, tier2, gap_text, other_content="", top_k=3):
-    """Find similar cases using embedding similarity and generate application strategies"""
-    # Load case embeddings
-    case_embeddings = get_case_embeddings()
     
-    # Create query embedding
-    query_text = f"{tier1} {tier2} {gap_text} {other_content}"
+    # Plain-text form of the diagnosis, passed as context to the template prompt
+    analysis = (
+        f"Reasoning: {fields['reasoning']}\n"
+        f"Tier 1 Categories: {fields['tier1_categories']}\n"
+        f"Tier 2 Categories: {fields['tier2_categories']}"
+    )
+    
+    return {**fields, "full_analysis": analysis}
+
+# Resubmitting the same note (after an edit round-trip or a retry) reuses its embedding
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=256)
+def embed_query(query_text):
+    """Return the unit-length float32 embedding of a query text"""
     response = client.embeddings.create(
         input=query_text,
-        model="text-embedding-ada-002"
+        model=EMBEDDING_MODEL,
+        dimensions=EMBEDDING_DIMENSIONS
     )
-    query_embedding = response.data[0].embedding
-    
-    # Calculate similarity with all cases
-    similarities = {}
-    for case_id, case_embedding in case_embeddings.items():
-        similarity = np.dot(query_embedding, case_embedding)
-        similarities[case_id] = similarity
+    q = np.asarray(response.data[0].embedding, dtype=np.float32)
+    return q / np.linalg.norm(q)
+
+def find_similar_cases(tier1, tier2, gap_text, other_content="", top_k=3):
+    """Find similar cases using embedding similarity and generate application strategies"""
+    # Load the case search index (or the embedding matrix without FAISS)
+    case_ids, index, embeddings_matrix = get_case_index()
     
-    # Sort by similarity and return top k
-    sorted_cases = sorted(similarities.items(), key=lambda x: x[1], reverse=True)
-    top_case_ids = [case_id for case_id, _ in sorted_cases[:top_k]]
+    # Create query embedding; build_case_text collapses whitespace so trivially different notes share a cache entry
+    query_text = build_case_text({
+        "tier1_categories": tier1,
+        "tier2_categories": tier2,
+        "gap_text": gap_text,
+        "other_content": other_content
+    })
+    q = embed_query(query_text)
+    k = min(top_k, len(case_ids))
+    
+    if index is not None:
+        # FAISS returns the top k already sorted by inner product
+        top_scores, top_idx = index.search(q.reshape(1, -1), k)
+        top_scores, top_idx = top_scores[0], top_idx[0]
+    else:
+        # Calculate cosine similarity with all cases in a single matrix-vector product
+        sims = embeddings_matrix @ q
+        
+        # Select the top k in O(N), then sort only those k
+        top_idx = np.argpartition(sims, -k)[-k:]
+        top_idx = top_idx[np.argsort(-sims[top_idx])]
+        top_scores = sims[top_idx]
     
     # Get the full case data
-    similar_cases = []
-    for case_id in top_case_ids:
-        for case in case_studies:
-            if case["id"] == case_id:
-                case_with_similarity = case.copy()
-                case_with_similarity["similarity_score"] = similarities[case_id]
-                similar_cases.append(case_with_similarity)
-                break
-    
-    return similar_cases
-
-def generate_personalized_template(student_note, diagnosis, similar_case):
-    """Generate a personalized practice template based on the diagnosis and similar case"""
+    return [
+        {**CASE_BY_ID[case_ids[i]], "similarity_score": float(score)}
+        for i, score in zip(top_idx, top_scores)
+    ]
+
+def stream_personalized_template(student_note, diagnosis, similar_case):
+    """Stream a personalized practice template based on the diagnosis and similar case, chunk by chunk"""
     # Determine which template to use based on tier2 categories
     template_content = ""
     if "Assessing risks" in diagnosis.get("tier2_categories", ""):
@@ -309,17 +380,43 @@ Ensure you replace the [LLM will insert...] sections with actual content.
 """
 
     response = client.chat.completions.create(
-        model="gpt-4o-mini",  # Much cheaper than gpt-4
+        model=MODEL_FAST,
         messages=[{"role": "system", "content": prompt}],
-        temperature=0.7
+        temperature=0.7,
+        stream=True
     )
     
-    return response.choices[0].message.content
+    for chunk in response:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+# Matches each "## " heading line in a generated template
+TEMPLATE_SECTION_RE = re.compile(r'^## (.*)$', re.MULTILINE)
+
+def template_section(title, content):
+    """Build a template section, sizing its response box from the content length (100-300px)"""
+    return {"title": title, "content": content, "height": min(max(100, len(content) // 5), 300)}
+
+def parse_template_sections(template):
+    """Split a generated template into {"title", "content", "height"} sections at each "## " heading"""
+    # re.split keeps the captured titles, alternating with the body that follows each heading
+    parts = TEMPLATE_SECTION_RE.split(template + "\n")
+    
+    template_sections = []
+    if parts[0]:
+        template_sections.append(template_section("Introduction", parts[0]))
+    for i in range(1, len(parts), 2):
+        template_sections.append(template_section(parts[i].strip(), "## " + parts[i] + parts[i + 1]))
+    
+    return template_sections
+
+# Maximum number of OpenAI requests in flight at once for concurrent generation
+MAX_CONCURRENT_REQUESTS = 10
 
 # Add new function to generate "How This Applies To You" section
-def generate_application_strategies(student_note, diagnosis, similar_case):
-    """Generate personalized application strategies based on the diagnosis and similar case"""
-    prompt = f"""Create 3-4 concise, actionable strategies for applying lessons from a similar case to this student's situation.
+def build_application_strategies_prompt(student_note, diagnosis, similar_case):
+    """Build the prompt for the "How This Applies To You" strategies of one similar case"""
+    return f"""Create 3-4 concise, actionable strategies for applying lessons from a similar case to this student's situation.
 
 **Student's Situation:**
 {student_note}
@@ -340,18 +437,36 @@ def generate_application_strategies(student_note, diagnosis, similar_case):
 **Another Strategy:** Another brief, actionable description.
 """
 
+# Fallback for a case the Analyze step did not prefetch; repeat analyses are memoized by generate_case_guidance
+def generate_application_strategies(student_note, diagnosis, similar_case):
+    """Generate personalized application strategies based on the diagnosis and similar case"""
+    prompt = build_application_strategies_prompt(student_note, diagnosis, similar_case)
+
     response = client.chat.completions.create(
-        model="gpt-4o-mini",
+        model=MODEL_FAST,
         messages=[{"role": "system", "content": prompt}],
         temperature=0.7
     )
     
     return response.choices[0].message.content
 
+async def agenerate_application_strategies(aclient, semaphore, student_note, diagnosis, similar_case):
+    """Async variant of generate_application_strategies, bounded by a shared semaphore"""
+    prompt = build_application_strategies_prompt(student_note, diagnosis, similar_case)
+
+    async with semaphore:
+        response = await aclient.chat.completions.create(
+            model=MODEL_FAST,
+            messages=[{"role": "system", "content": prompt}],
+            temperature=0.7
+        )
+    
+    return response.choices[0].message.content
+
 # Add new function for generating suggested questions with better formatting
-def generate_suggested_questions(student_note, diagnosis, similar_case):
-    """Generate suggested questions for peer conversations based on regulation gap and similar case"""
-    prompt = f"""Generate 6-9 focused questions for peer conversations about this regulation gap.
+def build_suggested_questions_prompt(student_note, diagnosis, similar_case):
+    """Build the prompt for the peer discussion questions of one similar case"""
+    return f"""Generate 6-9 focused questions for peer conversations about this regulation gap.
 
 **Student Assessment:** {student_note}
 **Gap Type:** {diagnosis["tier1_categories"]} - {diagnosis["tier2_categories"]}
@@ -395,228 +510,205 @@ def generate_suggested_questions(student_note, diagnosis, similar_case):
 - End each question with a question mark
 """
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "system", "content": prompt}],
-        temperature=0.7
-    )
-    
-    # Get the raw response
-    raw_response = response.choices[0].message.content.strip()
-    
-    # Enhanced processing to ensure proper bullet point separation
-    lines = raw_response.split('\n')
+# Patterns for normalizing generated question lists
+QUESTION_HEADER_RE = re.compile(r'^\*\*[^?]*\*\*$')  # bold section header, not a question
+BULLET_RE = re.compile(r'\s*•\s*')
+QUESTION_END_RE = re.compile(r'(?<=\?)\s*')  # split point after each question mark
+MULTIBLANK_RE = re.compile(r'\n{3,}')
+
+def format_suggested_questions(raw_response):
+    """Put every generated question bullet on its own line, with blank lines around section headers"""
     formatted_lines = []
     
-    for line in lines:
+    for line in raw_response.splitlines():
         line = line.strip()
-        
-        # Skip completely empty lines during processing
         if not line:
             continue
-            
-        # Handle section headers (bold text without question marks)
-        if line.startswith('**') and line.endswith('**') and '?' not in line:
-            # Add spacing before section headers (except first one)
+        
+        if QUESTION_HEADER_RE.match(line):
+            # Add spacing before section headers (except first one) and after every header
             if formatted_lines:
                 formatted_lines.append("")
-            formatted_lines.append(line)
-            formatted_lines.append("")  # Always add space after header
-            
-        # Handle lines that contain bullet points
+            formatted_lines.extend((line, ""))
         elif '•' in line:
-            # Check if multiple bullet points are crammed on one line
-            if line.count('•') > 1:
-                # Split by bullet points and process each separately
-                parts = line.split('•')
-                for i, part in enumerate(parts):
-                    if i == 0:  # First part before any bullet
-                        continue
-                    part = part.strip()
-                    if part:
-                        # Check if this part contains another question (look for '?')
-                        if '?' in part:
-                            # Further split by question marks if multiple questions
-                            questions = part.split('?')
-                            for j, question in enumerate(questions):
-                                question = question.strip()
-                                if question:  # Not empty
-                                    if j < len(questions) - 1:  # Not the last part
-                                        formatted_lines.append(f"• {question}?")
-                                    elif question != "":  # Last part, add only if not empty
-                                        formatted_lines.append(f"• {question}?")
-                        else:
-                            formatted_lines.append(f"• {part}")
-            else:
-                # Single bullet point on line
-                if line.startswith('•'):
-                    formatted_lines.append(line)
-                else:
-                    # Bullet point not at start, fix it
-                    bullet_part = line.split('•', 1)[1].strip()
-                    if bullet_part:
-                        formatted_lines.append(f"• {bullet_part}")
-                        
-        # Handle other bullet formats (-, *)
+            parts = BULLET_RE.split(line)[1:]
+            if len(parts) > 1:
+                # Several bullets crammed onto one line: one bullet per question; a single bullet is kept whole
+                parts = [question for part in parts for question in QUESTION_END_RE.split(part)]
+            formatted_lines.extend(f"• {part}" for part in parts if part)
         elif line.startswith(('-', '*')):
+            # Other bullet formats (-, *)
             question_text = line.lstrip('-*').strip()
             if question_text:
                 formatted_lines.append(f"• {question_text}")
-                
-        # Handle regular text (non-headers, non-bullets)
         else:
             formatted_lines.append(line)
     
-    # Join with line breaks
-    result = '\n'.join(formatted_lines)
-    
-    # Clean up excessive spacing while maintaining section breaks
-    while '\n\n\n' in result:
-        result = result.replace('\n\n\n', '\n\n')
-    
-    # Final check: ensure no bullet points are on the same line
-    final_lines = result.split('\n')
-    truly_final_lines = []
-    
-    for line in final_lines:
-        if line.count('•') > 1:
-            # Still have multiple bullets on one line, fix it
-            parts = line.split('•')
-            for i, part in enumerate(parts):
-                if i == 0:
-                    continue
-                part = part.strip()
-                if part:
-                    truly_final_lines.append(f"• {part}")
-        else:
-            truly_final_lines.append(line)
+    # Collapse runs of blank lines left between adjacent sections
+    return MULTIBLANK_RE.sub("\n\n", "\n".join(formatted_lines)).strip()
+
+# Fallback for a case the Analyze step did not prefetch; repeat analyses are memoized by generate_case_guidance
+def generate_suggested_questions(student_note, diagnosis, similar_case):
+    """Generate suggested questions for peer conversations based on regulation gap and similar case"""
+    prompt = build_suggested_questions_prompt(student_note, diagnosis, similar_case)
+
+    response = client.chat.completions.create(
+        model=MODEL_FAST,
+        messages=[{"role": "system", "content": prompt}],
+        temperature=0.7
+    )
     
-    return '\n'.join(truly_final_lines).strip()
+    return format_suggested_questions(response.choices[0].message.content)
 
-# Add new function for audio transcription
-def transcribe_audio(audio_bytes):
-    """Transcribe audio using OpenAI's Whisper API"""
-    try:
-        # Convert audio bytes to a file-like object
-        audio_file = io.BytesIO(audio_bytes)
-        audio_file.name = "recording.wav"  # Whisper API needs a filename
-        
-        # Transcribe using Whisper
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file,
-            response_format="text"
+async def agenerate_suggested_questions(aclient, semaphore, student_note, diagnosis, similar_case):
+    """Async variant of generate_suggested_questions, bounded by a shared semaphore"""
+    prompt = build_suggested_questions_prompt(student_note, diagnosis, similar_case)
+
+    async with semaphore:
+        response = await aclient.chat.completions.create(
+            model=MODEL_FAST,
+            messages=[{"role": "system", "content": prompt}],
+            temperature=0.7
         )
-        
-        return transcript
-    except Exception as e:
-        st.error(f"Error transcribing audio: {str(e)}")
-        return None
+    
+    return format_suggested_questions(response.choices[0].message.content)
 
-def transcribe_uploaded_audio(uploaded_file):
-    """Transcribe uploaded audio file using OpenAI's Whisper API"""
+async def generate_all_case_guidance(student_note, diagnosis, similar_cases):
+    """Generate application strategies and discussion questions for every similar case concurrently
+    
+    Returns (strategies, questions), two lists in case order.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    # Scope the async client to this event loop; asyncio.run creates a new loop per call
+    async with AsyncOpenAI(api_key=api_key) as aclient:
+        strategies, questions = await asyncio.gather(
+            asyncio.gather(*[
+                agenerate_application_strategies(aclient, semaphore, student_note, diagnosis, case)
+                for case in similar_cases
+            ]),
+            asyncio.gather(*[
+                agenerate_suggested_questions(aclient, semaphore, student_note, diagnosis, case)
+                for case in similar_cases
+            ])
+        )
+    return strategies, questions
+
+# Re-analyzing the same note (after "Back to Edit", or from another session) reuses the generated guidance
+@st.cache_data(show_spinner=False, ttl=3600)
+def generate_case_guidance(student_note, diagnosis, similar_cases):
+    """Return the (strategies, questions) of generate_all_case_guidance, memoized on the note, diagnosis and cases"""
+    return asyncio.run(generate_all_case_guidance(student_note, diagnosis, similar_cases))
+
+# Add new function for audio transcription
+def transcribe_audio(audio_file):
+    """Transcribe a named audio file-like object (an upload or a BytesIO) using OpenAI's Whisper API"""
     try:
-        # Read the uploaded file
-        audio_bytes = uploaded_file.read()
-        
-        # Create a file-like object
-        audio_file = io.BytesIO(audio_bytes)
-        audio_file.name = uploaded_file.name  # Use original filename
-        
-        # Transcribe using Whisper
-        transcript = client.audio.transcriptions.create(
+        # Whisper infers the format from the file name; rewind in case the file was already read for playback
+        audio_file.seek(0)
+        return client.audio.transcriptions.create(
             model="whisper-1",
             file=audio_file,
             response_format="text"
         )
-        
-        return transcript
     except Exception as e:
-        st.error(f"Error transcribing uploaded audio: {str(e)}")
+        st.error(f"Error transcribing audio: {str(e)}")
         return None
 
+# Editable assessment fields and their labels, in display order
+SUMMARY_FIELDS = {
+    "Assessment Title": "title",
+    "Gap (What needs improvement)": "gap",
+    "Context": "context",
+    "Plan & Reflect": "plan",
+    "Coach Practice Suggestion": "coach_suggestion",
+}
+
+def field_text(value):
+    """Return a summary field as one line of text, whether the model sent a string, a list or another value"""
+    if isinstance(value, list):
+        return "; ".join(str(item) for item in value)
+    return str(value) if value else ""
+
+@st.cache_data(show_spinner=False, ttl=3600)
 def summarize_transcription(transcription, meeting_type="SIG Meeting"):
-    """Summarize the transcription using GPT-4 to extract key coaching points based on meeting type"""
+    """Summarize the transcription into the five assessment fields (a dict keyed like extracted_fields)"""
     
     if meeting_type == "SIG Meeting":
         prompt = f"""You are helping a coach organize their verbal assessment notes from a SIG (Student-Instructor/Coach) meeting.
         
-        Please analyze this transcription of a coaching session between a coach and student and organize it into the following structure:
+        Please analyze this transcription of a coaching session between a coach and student and reply with a JSON object with these string keys:
         
-        **Assessment Title:** [Brief title summarizing the main issue discussed]
-        **Gap (What needs improvement):** [The main regulation gap or challenge the coach identified in the student]
-        **Context:** [The situation or background where this gap was observed by the coach]
-        **Plan & Reflect:** [Any plans mentioned or reflection questions the coach suggested]
-        **Coach Practice Suggestion:** [Specific practice exercises or activities the coach recommended]
+        "title": [Brief title summarizing the main issue discussed]
+        "gap": [The main regulation gap or challenge the coach identified in the student]
+        "context": [The situation or background where this gap was observed by the coach]
+        "plan": [Any plans mentioned or reflection questions the coach suggested]
+        "coach_suggestion": [Specific practice exercises or activities the coach recommended]
         
         Focus on the coach's perspective and assessment of the student's learning gaps.
         
         Here's the transcription:
         {transcription}
         
-        Please extract and organize the key information into the five categories above. If any category isn't clearly mentioned in the transcription, indicate it as "Not specified" or suggest what might be relevant based on context.
+        Please extract and organize the key information into the five keys above. If any of them isn't clearly mentioned in the transcription, indicate it as "Not specified" or suggest what might be relevant based on context.
         """
     else:  # Peer Conversation
         prompt = f"""You are helping organize notes from a peer-to-peer discussion between students.
         
-        Please analyze this transcription of a peer conversation and organize it into the following structure:
+        Please analyze this transcription of a peer conversation and reply with a JSON object with these string keys:
         
-        **Assessment Title:** [Brief title summarizing the main topic or challenge discussed]
-        **Gap (What needs improvement):** [Learning challenges or knowledge gaps identified during the discussion]
-        **Context:** [The situation or background being discussed between peers]
-        **Plan & Reflect:** [Any plans, solutions, or reflection points that emerged from the discussion]
-        **Coach Practice Suggestion:** [Peer recommendations or study strategies suggested]
+        "title": [Brief title summarizing the main topic or challenge discussed]
+        "gap": [Learning challenges or knowledge gaps identified during the discussion]
+        "context": [The situation or background being discussed between peers]
+        "plan": [Any plans, solutions, or reflection points that emerged from the discussion]
+        "coach_suggestion": [Peer recommendations or study strategies suggested]
         
         Focus on collaborative learning insights and peer-identified improvement areas.
         
         Here's the transcription:
         {transcription}
         
-        Please extract and organize the key information into the five categories above. If any category isn't clearly mentioned in the transcription, indicate it as "Not specified" or suggest what might be relevant based on context.
+        Please extract and organize the key information into the five keys above. If any of them isn't clearly mentioned in the transcription, indicate it as "Not specified" or suggest what might be relevant based on context.
         """
     
     response = client.chat.completions.create(
-        model="gpt-4o-mini",  # Much cheaper than gpt-4
+        model=MODEL_FAST,
         messages=[{"role": "system", "content": prompt}],
-        temperature=0.3
+        temperature=0.3,
+        response_format={"type": "json_object"}
     )
     
-    return response.choices[0].message.content
+    data = parse_json(response.choices[0].message.content)
+    # "plan" and "coach_suggestion" often come back as lists, so normalize every field to text
+    return {key: field_text(data.get(key)) for key in SUMMARY_FIELDS.values()}
+
+# Short labels for the assessment fields in the student note sent to diagnosis and generation
+STUDENT_NOTE_LABELS = {
+    "title": "Title",
+    "gap": "Gap",
+    "context": "Context",
+    "plan": "Plan",
+    "coach_suggestion": "Coach Suggestion",
+}
+
+def format_student_note(fields):
+    """Combine the assessment fields into the labelled, one-field-per-line student note"""
+    return "\n".join(f"{label}: {fields[key]}" for key, label in STUDENT_NOTE_LABELS.items())
+
+def format_summary_markdown(fields):
+    """Render the assessment fields as the bold-labelled markdown shown under View AI Summary"""
+    return "\n\n".join(f"**{label}:** {fields[key]}" for label, key in SUMMARY_FIELDS.items())
 
 def process_transcription_and_analyze():
     """Combined function to transcribe, summarize, analyze, and navigate to results"""
     with st.spinner("Transcribing and summarizing... (this may take ~2 minutes)"):
         # Summarize the transcription
-        summary = summarize_transcription(st.session_state.transcription, st.session_state.meeting_type)
-        st.session_state.audio_summary = summary
-        
-        # Parse the summary to extract components
-        lines = summary.split('\n')
-        extracted_title = ""
-        extracted_gap = ""
-        extracted_context = ""
-        extracted_plan = ""
-        extracted_coach_suggestion = ""
-        
-        for line in lines:
-            if "Assessment Title:" in line or "**Assessment Title:**" in line:
-                extracted_title = line.split("Assessment Title:")[-1].replace("**", "").strip()
-            elif "Gap (What needs improvement):" in line or "**Gap (What needs improvement):**" in line:
-                extracted_gap = line.split("Gap (What needs improvement):")[-1].replace("**", "").strip()
-            elif "Context:" in line or "**Context:**" in line:
-                extracted_context = line.split("Context:")[-1].replace("**", "").strip()
-            elif "Plan & Reflect:" in line or "**Plan & Reflect:**" in line:
-                extracted_plan = line.split("Plan & Reflect:")[-1].replace("**", "").strip()
-            elif "Coach Practice Suggestion:" in line or "**Coach Practice Suggestion:**" in line:
-                extracted_coach_suggestion = line.split("Coach Practice Suggestion:")[-1].replace("**", "").strip()
+        extracted_fields = summarize_transcription(st.session_state.transcription, st.session_state.meeting_type)
+        st.session_state.audio_summary = format_summary_markdown(extracted_fields)
         
         # Store extracted fields for editing
         st.session_state.extracted_fields = {
-            'title': extracted_title if extracted_title else "Audio Assessment",
-            'gap': extracted_gap,
-            'context': extracted_context,
-            'plan': extracted_plan,
-            'coach_suggestion': extracted_coach_suggestion
+            **extracted_fields,
+            'title': extracted_fields['title'] or "Audio Assessment"
         }
         
         # Navigate to edit page
@@ -626,7 +718,9 @@ def process_transcription_and_analyze():
 def transcribe_and_summarize_recording(audio_data):
     """Transcribe recorded audio and go to edit page"""
     with st.spinner("Transcribing audio... (this may take ~2 minutes)"):
-        transcription = transcribe_audio(audio_data)
+        audio_file = io.BytesIO(audio_data)
+        audio_file.name = "recording.wav"  # Whisper API needs a filename
+        transcription = transcribe_audio(audio_file)
         if transcription:
             st.session_state.transcription = transcription
             st.success("Audio transcribed successfully!")
@@ -638,7 +732,8 @@ def transcribe_and_summarize_recording(audio_data):
 def transcribe_and_summarize_upload(uploaded_file):
     """Transcribe uploaded audio and go to edit page"""
     with st.spinner("Transcribing uploaded audio... (this may take ~2 minutes)"):
-        transcription = transcribe_uploaded_audio(uploaded_file)
+        # UploadedFile is already a named in-memory file, so it is passed through without a copy
+        transcription = transcribe_audio(uploaded_file)
         if transcription:
             st.session_state.transcription = transcription
             st.success("Audio transcribed successfully!")
@@ -657,6 +752,9 @@ def go_to_results_page():
 def go_to_template_page(case_index):
     st.session_state.page = 'template'
     st.session_state.selected_case = st.session_state.similar_cases[case_index]
+    # A new case needs its own template
+    st.session_state.current_template = None
+    st.session_state.template_sections = None
 
 def go_back_to_results():
     st.session_state.page = 'results'
@@ -685,96 +783,57 @@ def go_to_peer_meeting():
         'shared_challenges': ['Understanding why design arguments fail', 'Articulating testing insights']
     }
 
+def render_case_details(case):
+    """Render one similar case with its "How This Applies To You" strategies and discussion questions"""
+    # Case details, as one markdown element
+    st.markdown("\n\n".join([
+        f"**Project:** {case.get('project', 'N/A')}",
+        f"**Gap:** {case.get('gap_text', 'N/A')}",
+        f"**Tier 1 Categories:** {case.get('tier1_categories', 'N/A')}",
+        f"**Tier 2 Categories:** {case.get('tier2_categories', 'N/A')}",
+        f"**Other Content:** {case.get('other_content', 'N/A')}",
+        f"**Similarity Score:** {case.get('similarity_score', 0):.4f}"
+    ]))
+    
+    # Add "How This Applies To You" section, generated once per case
+    if case["id"] not in st.session_state.strategies_by_case_id:
+        st.session_state.strategies_by_case_id[case["id"]] = generate_application_strategies(
+            st.session_state.student_note, 
+            st.session_state.diagnosis, 
+            case
+        )
+    application_strategies = st.session_state.strategies_by_case_id[case["id"]]
+    st.subheader("How This Applies To You")
+    with st.container(border=True):
+        st.markdown(application_strategies)
+    
+    # Add suggested questions section
+    st.subheader("Suggested Discussion Questions")
+    st.write("Use these questions to guide peer conversations about this regulation gap:")
+    
+    # Generate questions if not already cached for this case
+    if case["id"] not in st.session_state.questions_by_case_id:
+        with st.spinner("Generating discussion questions..."):
+            st.session_state.questions_by_case_id[case["id"]] = generate_suggested_questions(
+                st.session_state.student_note,
+                st.session_state.diagnosis,
+                case
+            )
+    
+    # Display the questions with improved formatting
+    questions_content = st.session_state.questions_by_case_id[case["id"]]
+    with st.container(border=True):
+        st.markdown(questions_content)
+
+def render_similar_cases():
+    """Render each similar case in a native expander; expanding and collapsing happen in the browser"""
+    for i, case in enumerate(st.session_state.similar_cases):
+        with st.expander(f"Case {i+1}: {case['gap_text'][:100]}..."):
+            render_case_details(case)
+
 # Custom CSS for better layout
-st.markdown("""
+CUSTOM_CSS = """
 <style>
-    .personalized-template {
-        background-color: #f5f5f5;
-        border-radius: 10px;
-        padding: 15px;
-        margin-bottom: 20px;
-    }
-    
-    .application-section {
-        background: linear-gradient(135deg, #e8f7ee 0%, #f0fdf4 100%);
-        border-left: 4px solid #22c55e;
-        border-radius: 8px;
-        padding: 20px;
-        margin: 15px 0;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-    }
-    
-    .application-section h4 {
-        color: #15803d;
-        margin-top: 0;
-        margin-bottom: 15px;
-        font-weight: 600;
-    }
-    
-    .application-section ul {
-        margin: 0;
-        padding-left: 0;
-    }
-    
-    .application-section li {
-        margin-bottom: 12px;
-        line-height: 1.5;
-        list-style: none;
-    }
-    
-    .questions-section {
-        background: linear-gradient(135deg, #eff6ff 0%, #f0f9ff 100%);
-        border-left: 4px solid #3b82f6;
-        border-radius: 8px;
-        padding: 20px;
-        margin: 15px 0;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-    }
-    
-    .questions-section h4 {
-        color: #1d4ed8;
-        margin-top: 0;
-        margin-bottom: 15px;
-        font-weight: 600;
-    }
-    
-    .questions-section ul {
-        margin: 0;
-        padding-left: 0;
-    }
-    
-    .questions-section li {
-        margin-bottom: 8px;
-        line-height: 1.4;
-        list-style: none;
-    }
-    
-    .case-button {
-        width: 100%;
-        text-align: left;
-        padding: 15px;
-        margin: 8px 0;
-        border: 1px solid #e2e8f0;
-        border-radius: 8px;
-        background: white;
-        cursor: pointer;
-        transition: all 0.2s ease;
-    }
-    
-    .case-button:hover {
-        border-color: #3b82f6;
-        box-shadow: 0 2px 8px rgba(59, 130, 246, 0.1);
-    }
-    
-    .case-expanded {
-        border-color: #3b82f6;
-        background-color: #f8fafc;
-    }
-    
-    .stButton button {
-        width: 100%;
-    }
-    
     .stButton > button {
         width: 100%;
         text-align: left;
@@ -795,76 +854,8 @@ st.markdown("""
         box-shadow: 0 2px 8px rgba(59, 130, 246, 0.1);
     }
     
-    /* Specific styling for primary buttons (transcribe button) */
+    /* Primary buttons (transcribe, analyze); Streamlit sets kind="primary" on them in every version */
     .stButton > button[kind="primary"] {
-        background-color: #dc2626 !important;
-        color: white !important;
-        border: 1px solid #dc2626 !important;
-        font-weight: 600;
-    }
-    
-    .stButton > button[kind="primary"]:hover {
-        background-color: #b91c1c !important;
-        border-color: #b91c1c !important;
-        box-shadow: 0 4px 12px rgba(220, 38, 38, 0.3) !important;
-    }
-    
-    /* Alternative selector for primary buttons */
-    div[data-testid="stButton"] > button[kind="primary"] {
-        background-color: #dc2626 !important;
-        color: white !important;
-        border: 1px solid #dc2626 !important;
-        font-weight: 600;
-    }
-    
-    div[data-testid="stButton"] > button[kind="primary"]:hover {
-        background-color: #b91c1c !important;
-        border-color: #b91c1c !important;
-        box-shadow: 0 4px 12px rgba(220, 38, 38, 0.3) !important;
-    }
-    
-    /* Force primary button styling with more specific selectors */
-    button.stButton.stButton-primary {
-        background-color: #dc2626 !important;
-        color: white !important;
-        border: 1px solid #dc2626 !important;
-    }
-    
-    /* Even more specific targeting for Streamlit primary buttons */
-    button[data-testid="baseButton-primary"] {
-        background-color: #dc2626 !important;
-        color: white !important;
-        border: 1px solid #dc2626 !important;
-        font-weight: 600 !important;
-    }
-    
-    button[data-testid="baseButton-primary"]:hover {
-        background-color: #b91c1c !important;
-        border-color: #b91c1c !important;
-        box-shadow: 0 4px 12px rgba(220, 38, 38, 0.3) !important;
-    }
-    
-    /* Target by button text content for extra specificity */
-    button:contains("🎯 Transcribe"), 
-    button:contains("🔍 Analyze") {
-        background-color: #dc2626 !important;
-        color: white !important;
-        border: 1px solid #dc2626 !important;
-        font-weight: 600 !important;
-    }
-    
-    button:contains("🎯 Transcribe"):hover, 
-    button:contains("🔍 Analyze"):hover {
-        background-color: #b91c1c !important;
-        border-color: #b91c1c !important;
-        box-shadow: 0 4px 12px rgba(220, 38, 38, 0.3) !important;
-    }
-    
-    /* Override any Streamlit default primary button styling */
-    .stButton button[kind="primary"],
-    .stButton button[data-testid="baseButton-primary"],
-    button[kind="primary"],
-    button[data-testid="baseButton-primary"] {
         background-color: #dc2626 !important;
         background-image: none !important;
         color: white !important;
@@ -872,10 +863,7 @@ st.markdown("""
         font-weight: 600 !important;
     }
     
-    .stButton button[kind="primary"]:hover,
-    .stButton button[data-testid="baseButton-primary"]:hover,
-    button[kind="primary"]:hover,
-    button[data-testid="baseButton-primary"]:hover {
+    .stButton > button[kind="primary"]:hover {
         background-color: #b91c1c !important;
         background-image: none !important;
         border-color: #b91c1c !important;
@@ -886,11 +874,6 @@ st.markdown("""
         margin-top: 20px;
     }
     
-    .nav-button {
-        margin-top: 20px;
-        margin-bottom: 20px;
-    }
-    
     /* Specific styling for case buttons (non-primary) */
     .stButton > button:not([kind="primary"]) {
         width: 100% !important;
@@ -926,38 +909,17 @@ st.markdown("""
         margin: 4px 0 !important;
         width: 100% !important;
     }
-    
-    /* Force uniform button styling for case buttons */
-    button[key*="case_button_"] {
-        width: 100% !important;
-        text-align: left !important;
-        padding: 15px 20px !important;
-        margin: 8px 0 !important;
-        border: 1px solid #e2e8f0 !important;
-        border-radius: 8px !important;
-        background: white !important;
-        color: #374151 !important;
-        font-weight: 400 !important;
-        font-size: 14px !important;
-        line-height: 1.4 !important;
-        height: 60px !important;
-        overflow: hidden !important;
-        text-overflow: ellipsis !important;
-        white-space: nowrap !important;
-        cursor: pointer !important;
-        transition: all 0.2s ease !important;
-        box-sizing: border-box !important;
-        display: flex !important;
-        align-items: center !important;
-    }
-    
-    button[key*="case_button_"]:hover {
-        border-color: #3b82f6 !important;
-        box-shadow: 0 2px 8px rgba(59, 130, 246, 0.1) !important;
-        background-color: #f8fafc !important;
-    }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# The script re-executes on every rerun, so the minified string is cached as data rather than recomputed
+@st.cache_data(show_spinner=False)
+def minify_css(css):
+    """Strip comments and collapse whitespace in a stylesheet"""
+    return re.sub(r"\s+", " ", re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)).strip()
+
+# Emitted on every full rerun, since Streamlit drops any element a rerun does not re-emit
+st.markdown(minify_css(CUSTOM_CSS), unsafe_allow_html=True)
 
 # MAIN UI LOGIC
 st.title("Peer to Peer Learning System")
@@ -1003,36 +965,13 @@ if st.session_state.page == 'input':
         # Process sample transcript instantly
         with st.spinner("Analyzing sample transcript..."):
             # Summarize the sample transcription
-            summary = summarize_transcription(sample_transcript, "SIG Meeting")
-            st.session_state.audio_summary = summary
-            
-            # Parse the summary to extract components
-            lines = summary.split('\n')
-            extracted_title = ""
-            extracted_gap = ""
-            extracted_context = ""
-            extracted_plan = ""
-            extracted_coach_suggestion = ""
-            
-            for line in lines:
-                if "Assessment Title:" in line or "**Assessment Title:**" in line:
-                    extracted_title = line.split("Assessment Title:")[-1].replace("**", "").strip()
-                elif "Gap (What needs improvement):" in line or "**Gap (What needs improvement):**" in line:
-                    extracted_gap = line.split("Gap (What needs improvement):")[-1].replace("**", "").strip()
-                elif "Context:" in line or "**Context:**" in line:
-                    extracted_context = line.split("Context:")[-1].replace("**", "").strip()
-                elif "Plan & Reflect:" in line or "**Plan & Reflect:**" in line:
-                    extracted_plan = line.split("Plan & Reflect:")[-1].replace("**", "").strip()
-                elif "Coach Practice Suggestion:" in line or "**Coach Practice Suggestion:**" in line:
-                    extracted_coach_suggestion = line.split("Coach Practice Suggestion:")[-1].replace("**", "").strip()
+            extracted_fields = summarize_transcription(sample_transcript, "SIG Meeting")
+            st.session_state.audio_summary = format_summary_markdown(extracted_fields)
             
             # Store extracted fields for editing
             st.session_state.extracted_fields = {
-                'title': extracted_title if extracted_title else "Sample Assessment",
-                'gap': extracted_gap,
-                'context': extracted_context,
-                'plan': extracted_plan,
-                'coach_suggestion': extracted_coach_suggestion
+                **extracted_fields,
+                'title': extracted_fields['title'] or "Sample Assessment"
             }
             
             # Navigate to edit page
@@ -1121,17 +1060,19 @@ elif st.session_state.page == 'edit':
     )
     
     # Update session state with edited values
-    st.session_state.extracted_fields['title'] = project_title
-    st.session_state.extracted_fields['gap'] = gap_text
-    st.session_state.extracted_fields['context'] = context
-    st.session_state.extracted_fields['plan'] = plan_reflect
-    st.session_state.extracted_fields['coach_suggestion'] = coach_suggestion
+    st.session_state.extracted_fields.update({
+        'title': project_title,
+        'gap': gap_text,
+        'context': context,
+        'plan': plan_reflect,
+        'coach_suggestion': coach_suggestion
+    })
     
     # Analyze button
     if st.button("🔍 Analyze Regulation Gap", key="analyze_edited", type="primary"):
         with st.spinner("Analyzing regulation gap..."):
             # Combine all fields into student_note
-            student_note = f"Title: {project_title}\nGap: {gap_text}\nContext: {context}\nPlan: {plan_reflect}\nCoach Suggestion: {coach_suggestion}"
+            student_note = format_student_note(st.session_state.extracted_fields)
             st.session_state.student_note = student_note
             st.session_state.project_title = project_title
             
@@ -1146,6 +1087,19 @@ elif st.session_state.page == 'edit':
                 context + " " + plan_reflect + " " + coach_suggestion
             )
             
+            # Generate "How This Applies To You" and discussion questions for all similar cases concurrently
+            strategies, questions = generate_case_guidance(
+                student_note,
+                st.session_state.diagnosis,
+                st.session_state.similar_cases
+            )
+            st.session_state.strategies_by_case_id = {
+                case["id"]: text for case, text in zip(st.session_state.similar_cases, strategies)
+            }
+            st.session_state.questions_by_case_id = {
+                case["id"]: text for case, text in zip(st.session_state.similar_cases, questions)
+            }
+            
             # Navigate to results page
             go_to_results_page()
             st.rerun()
@@ -1173,69 +1127,15 @@ elif st.session_state.page == 'results':
     
     # Display diagnosis
     st.subheader("Regulation Gap Diagnosis")
-    st.write(f"**Tier 1 Categories:** {st.session_state.diagnosis['tier1_categories']}")
-    st.write(f"**Tier 2 Categories:** {st.session_state.diagnosis['tier2_categories']}")
-    st.write(f"**Reasoning:** {st.session_state.diagnosis['reasoning']}")
+    st.markdown("\n\n".join([
+        f"**Tier 1 Categories:** {st.session_state.diagnosis['tier1_categories']}",
+        f"**Tier 2 Categories:** {st.session_state.diagnosis['tier2_categories']}",
+        f"**Reasoning:** {st.session_state.diagnosis['reasoning']}"
+    ]))
     
     # Display similar cases with controlled expansion
     st.subheader("Similar Cases")
-    for i, case in enumerate(st.session_state.similar_cases):
-        # Check if this case should be expanded
-        is_expanded = st.session_state.expanded_case == i
-        
-        # Create the expander with controlled state
-        expander_key = f"case_expander_{i}"
-        
-        # Use columns to create a clickable header that controls expansion
-        header_text = f"Case {i+1}: {case['gap_text'][:100]}..."
-        
-        if st.button(header_text, key=f"case_button_{i}", help="Click to expand/collapse"):
-            # Toggle the expanded case
-            if st.session_state.expanded_case == i:
-                st.session_state.expanded_case = None  # Close if already open
-            else:
-                st.session_state.expanded_case = i  # Open this case, close others
-            st.rerun()
-        
-        # Show content only if this case is expanded
-        if is_expanded:
-            st.markdown("---")
-            
-            # Case details
-            st.write(f"**Project:** {case.get('project', 'N/A')}")
-            st.write(f"**Gap:** {case.get('gap_text', 'N/A')}")
-            st.write(f"**Tier 1 Categories:** {case.get('tier1_categories', 'N/A')}")
-            st.write(f"**Tier 2 Categories:** {case.get('tier2_categories', 'N/A')}")
-            st.write(f"**Other Content:** {case.get('other_content', 'N/A')}")
-            st.write(f"**Similarity Score:** {case.get('similarity_score', 0):.4f}")
-            
-            # Add "How This Applies To You" section
-            application_strategies = generate_application_strategies(
-                st.session_state.student_note, 
-                st.session_state.diagnosis, 
-                case
-            )
-            st.subheader("How This Applies To You")
-            st.markdown(f'<div class="application-section">{application_strategies}</div>', unsafe_allow_html=True)
-            
-            # Add suggested questions section
-            st.subheader("Suggested Discussion Questions")
-            st.write("Use these questions to guide peer conversations about this regulation gap:")
-            
-            # Generate questions if not already cached for this case
-            if f'questions_{i}' not in st.session_state:
-                with st.spinner("Generating discussion questions..."):
-                    st.session_state[f'questions_{i}'] = generate_suggested_questions(
-                        st.session_state.student_note,
-                        st.session_state.diagnosis,
-                        case
-                    )
-            
-            # Display the questions with improved formatting
-            questions_content = st.session_state[f"questions_{i}"]
-            st.markdown(f'<div class="questions-section">{questions_content}</div>', unsafe_allow_html=True)
-            
-            st.markdown("---")
+    render_similar_cases()
 
 # TEMPLATE PAGE
 elif st.session_state.page == 'template':
@@ -1252,14 +1152,20 @@ elif st.session_state.page == 'template':
     st.subheader(f"Personalized Template Based on Similar Case")
     st.write(f"**Regulation Gap:** {st.session_state.selected_case['gap_text']}")
     
-    # Generate template if needed
+    # Generate template if needed, showing it as it streams in
     if st.session_state.current_template is None:
-        with st.spinner("Generating personalized practice template..."):
-            st.session_state.current_template = generate_personalized_template(
-                st.session_state.student_note, 
-                st.session_state.diagnosis, 
-                st.session_state.selected_case
+        template_preview = st.empty()
+        with template_preview.container():
+            st.session_state.current_template = st.write_stream(
+                stream_personalized_template(
+                    st.session_state.student_note, 
+                    st.session_state.diagnosis, 
+                    st.session_state.selected_case
+                )
             )
+        # The finished template is re-rendered below as editable sections
+        template_preview.empty()
+        st.session_state.template_sections = parse_template_sections(st.session_state.current_template)
     
     # Option to download template at the top with correct project name
     st.download_button(
@@ -1269,26 +1175,8 @@ elif st.session_state.page == 'template':
         mime="text/markdown"
     )
     
-    # Parse template into sections
-    template_sections = []
-    current_section = {"title": "Introduction", "content": ""}
-    
-    for line in st.session_state.current_template.split('\n'):
-        if line.startswith('## '):
-            # Save the previous section
-            if current_section["content"]:
-                template_sections.append(current_section)
-            
-            # Start a new section
-            section_title = line[3:].strip()
-            current_section = {"title": section_title, "content": line + "\n"}
-        else:
-            # Add to current section
-            current_section["content"] += line + "\n"
-    
-    # Add the last section
-    if current_section["content"]:
-        template_sections.append(current_section)
+    # Sections were parsed once, right after the template was generated
+    template_sections = st.session_state.template_sections
     
     # Create a mapping of section titles to input labels
     section_input_mapping = {
@@ -1313,7 +1201,8 @@ elif st.session_state.page == 'template':
         cols = st.columns([3, 2])
         
         with cols[0]:
-            st.markdown(f'<div class="personalized-template">{section["content"]}</div>', unsafe_allow_html=True)
+            with st.container(border=True):
+                st.markdown(section["content"])
         
         with cols[1]:
             # Get appropriate label for the input box
@@ -1322,11 +1211,8 @@ elif st.session_state.page == 'template':
             # Get a unique key for this text area
             section_key = f"input_{i}_{section['title'].replace(' ', '_')}"
             
-            # Create text area with appropriate height based on content length
-            content_length = len(section["content"])
-            height = min(max(100, content_length // 5), 300)  # Adjust height based on content
-            
-            responses[section["title"]] = st.text_area(input_label, key=section_key, height=height)
+            # Text area height was sized from the content length when the template was parsed
+            responses[section["title"]] = st.text_area(input_label, key=section_key, height=section["height"])
     
     # Save button at the bottom
     if st.button("Save All Responses", key="save_all_responses"):
@@ -3,31 +3,8 @@ import shutil
 from pathlib import Path
 import json
 
-def setup_data_directories():
-    """Set up the necessary data directories and files for the peer2peer system"""
-    # Ensure we're in the right directory
-    script_dir = Path(os.path.dirname(os.path.abspath(__file__)))
-    
-    # Create data directory
-    data_dir = script_dir / "data"
-    data_dir.mkdir(exist_ok=True)
-    
-    # Create templates directory
-    templates_dir = script_dir / "templates"
-    templates_dir.mkdir(exist_ok=True)
-    
-    # Check for codebook in root directory first
-    root_codebook = Path("../data/codebook.txt")
-    peer2peer_codebook = data_dir / "codebook.txt"
-    
-    if root_codebook.exists():
-        print(f"Copying {root_codebook} to {peer2peer_codebook}")
-        shutil.copy(root_codebook, peer2peer_codebook)
-    elif not peer2peer_codebook.exists():
-        # Create a minimal codebook if it doesn't exist
-        print(f"Creating minimal codebook at {peer2peer_codebook}")
-        with open(peer2peer_codebook, "w", encoding="utf-8") as f:
-            f.write("""You are an expert in analyzing student regulation gaps. You need to categorize each CAP (Context, Assessment, Plan) note into these three tier 1 categories and their corresponding tier 2 categories:
+# Default files written when nothing better is available, encoded once up front
+DEFAULT_CODEBOOK = """You are an expert in analyzing student regulation gaps. You need to categorize each CAP (Context, Assessment, Plan) note into these three tier 1 categories and their corresponding tier 2 categories:
 
 1. Cognitive: The student lacks skills for approaching problems with an unknown answer
    - Representing problem and solution spaces
@@ -44,47 +21,31 @@ def setup_data_directories():
    - Embracing challenges and learning
 
 Focus primarily on the "Assessment" part of the note when categorizing, as this is the coach's perceived regulation gap.
-""")
-    
-    # Check for tiered_weighted_cases in root directory
-    root_cases = Path("../data/tiered_weighted_cases.json")
-    peer2peer_cases = data_dir / "tiered_weighted_cases.json"
-    
-    if root_cases.exists():
-        print(f"Copying {root_cases} to {peer2peer_cases}")
-        shutil.copy(root_cases, peer2peer_cases)
-    elif not peer2peer_cases.exists():
-        # Create a minimal case file if it doesn't exist
-        print(f"Creating sample case data at {peer2peer_cases}")
-        sample_cases = [
-            {
-                "id": "01",
-                "gap_text": "Not thinking carefully about what is needed given risks at this moment",
-                "other_content": "Title: Planning is too rushed\nContext: Sprint planning isn't considering what's actually needed",
-                "tier1_categories": "Cognitive",
-                "tier2_categories": "Assessing risks",
-                "original_text": "Project: Sample Project\nGap: Not thinking carefully about what is needed given risks at this moment",
-                "project": "Sample Project"
-            },
-            {
-                "id": "02",
-                "gap_text": "Struggling to visualize the problem clearly",
-                "other_content": "Title: Lacks clear representation\nContext: Not sure how to represent the complex problem",
-                "tier1_categories": "Cognitive",
-                "tier2_categories": "Representing problem and solution spaces",
-                "original_text": "Project: Another Project\nGap: Struggling to visualize the problem clearly",
-                "project": "Another Project"
-            }
-        ]
-        with open(peer2peer_cases, "w", encoding="utf-8") as f:
-            json.dump(sample_cases, f, indent=2)
-    
-    # Check for base template and create if needed
-    base_template = templates_dir / "base_template.md"
-    if not base_template.exists():
-        print(f"Creating base template at {base_template}")
-        with open(base_template, "w", encoding="utf-8") as f:
-            f.write("""# Personalized Learning Plan
+""".encode("utf-8")
+
+SAMPLE_CASES = [
+    {
+        "id": "01",
+        "gap_text": "Not thinking carefully about what is needed given risks at this moment",
+        "other_content": "Title: Planning is too rushed\nContext: Sprint planning isn't considering what's actually needed",
+        "tier1_categories": "Cognitive",
+        "tier2_categories": "Assessing risks",
+        "original_text": "Project: Sample Project\nGap: Not thinking carefully about what is needed given risks at this moment",
+        "project": "Sample Project"
+    },
+    {
+        "id": "02",
+        "gap_text": "Struggling to visualize the problem clearly",
+        "other_content": "Title: Lacks clear representation\nContext: Not sure how to represent the complex problem",
+        "tier1_categories": "Cognitive",
+        "tier2_categories": "Representing problem and solution spaces",
+        "original_text": "Project: Another Project\nGap: Struggling to visualize the problem clearly",
+        "project": "Another Project"
+    }
+]
+SAMPLE_CASES_JSON = json.dumps(SAMPLE_CASES, indent=2).encode("utf-8")
+
+DEFAULT_BASE_TEMPLATE = """# Personalized Learning Plan
 
 ## Understanding Your Regulation Gap
 
@@ -105,14 +66,9 @@ Focus primarily on the "Assessment" part of the note when categorizing, as this
 * [Reflection prompt 1]
 * [Reflection prompt 2]
 * [Reflection prompt 3]
-""")
-    
-    # Check for risks template and create if needed
-    risks_template = templates_dir / "assessing_risks_template.md"
-    if not risks_template.exists():
-        print(f"Creating risks assessment template at {risks_template}")
-        with open(risks_template, "w", encoding="utf-8") as f:
-            f.write("""# Personalized Learning Plan: Improving Risk Assessment
+""".encode("utf-8")
+
+DEFAULT_RISKS_TEMPLATE = """# Personalized Learning Plan: Improving Risk Assessment
 
 ## Understanding Your Regulation Gap
 
@@ -187,8 +143,104 @@ Take time to document what you've learned recently:
 * How might you integrate risk assessment more systematically into your research process?
 * What barriers prevent you from thoroughly assessing risks before moving forward?
 * When have you successfully identified and addressed a significant risk? What approach did you use?
-""")
+""".encode("utf-8")
+
+# (file name, description for progress messages, default contents) for each file setup provides
+DATA_FILES = (
+    ("codebook.txt", "minimal codebook", DEFAULT_CODEBOOK),
+    ("tiered_weighted_cases.json", "sample case data", SAMPLE_CASES_JSON),
+)
+TEMPLATE_FILES = (
+    ("base_template.md", "base template", DEFAULT_BASE_TEMPLATE),
+    ("assessing_risks_template.md", "risks assessment template", DEFAULT_RISKS_TEMPLATE),
+)
+
+def file_names(path):
+    """Return the names of the regular files in a directory from a single listing
+    
+    A missing directory gives None, so callers can tell it apart from an empty one.
+    """
+    try:
+        with os.scandir(path) as entries:
+            # is_file() answers from the directory entry's own file type; only symlinks are stat'ed,
+            # so links to regular files still count as present (as Path.exists() did)
+            return frozenset(entry.name for entry in entries if entry.is_file())
+    except FileNotFoundError:
+        return None
+
+def write_atomic(path, data):
+    """Write bytes to a sibling temp file and rename it into place, so an interrupted run never leaves a partial file"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+def mtime_or_zero(path):
+    """Return a file's modification time, or 0 if it doesn't exist"""
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0
+
+def setup_data_directories():
+    """Set up the necessary data directories and files for the peer2peer system"""
+    # Deployments that already ship or mount the data can opt out entirely
+    if os.environ.get("PEER2PEER_SKIP_SETUP") == "1":
+        print("PEER2PEER_SKIP_SETUP=1; skipping data setup.")
+        return
+    
+    # Ensure we're in the right directory; __file__ is normally absolute already, so only resolve when it isn't
+    script_file = Path(__file__)
+    script_dir = script_file.parent if script_file.is_absolute() else script_file.resolve().parent
+    
+    data_dir = script_dir / "data"
+    # The root project's data directory, built lexically from the script location rather than the cwd
+    root_data_dir = script_dir.parent / "data"
+    templates_dir = script_dir / "templates"
+    
+    # List each directory once instead of probing every file with its own stat call
+    data_names = file_names(data_dir)
+    template_names = file_names(templates_dir)
+    
+    # A previous run leaves a marker; skip the whole setup while every managed file is still present
+    # and no root data file changed since (delete data/.setup_complete to force a full run)
+    sentinel = data_dir / ".setup_complete"
+    completed_at = mtime_or_zero(sentinel)
+    all_present = (data_names is not None and template_names is not None
+                   and all(name in data_names for name, _, _ in DATA_FILES)
+                   and all(name in template_names for name, _, _ in TEMPLATE_FILES))
+    if (completed_at and all_present
+            and completed_at >= max(mtime_or_zero(root_data_dir / name) for name, _, _ in DATA_FILES)):
+        print("Setup already complete; nothing to do.")
+        return
+    
+    # Create the data and templates directories only when the listing found them missing
+    if data_names is None:
+        data_dir.mkdir(parents=True, exist_ok=True)
+        data_names = frozenset()
+    if template_names is None:
+        templates_dir.mkdir(parents=True, exist_ok=True)
+        template_names = frozenset()
+    root_names = file_names(root_data_dir) or frozenset()
+    
+    # Data files: copy from the root project when it has them, otherwise create a default if missing
+    for name, description, default in DATA_FILES:
+        root_file = root_data_dir / name
+        target = data_dir / name
+        if name in root_names:
+            print(f"Copying {root_file} to {target}")
+            shutil.copyfile(root_file, target)
+        elif name not in data_names:
+            print(f"Creating {description} at {target}")
+            write_atomic(target, default)
+    
+    # Templates: create a default if missing
+    for name, description, default in TEMPLATE_FILES:
+        target = templates_dir / name
+        if name not in template_names:
+            print(f"Creating {description} at {target}")
+            write_atomic(target, default)
     
+    sentinel.touch()
     print("Setup complete! All necessary files and directories have been created.")
 
 if __name__ == "__main__":